@@ -1,10 +1,20 @@
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
+from langchain_core.exceptions import OutputParserException
+from pydantic import BaseModel, Field, ValidationError
+from typing import List
+import asyncio
+import io
+import json
 import os
 from dotenv import load_dotenv
-import json
-import re
+import functools
+import hashlib
 import logging
+import threading
+import uuid
+
+import batch_store
+from llm_batch import BatchedChatModel, LLMOverloadedError
+from llm_cache import create_cache_backend, make_cache_key, SemanticIndex
 
 
 # Configure logging
@@ -14,21 +24,107 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
+GEMINI_MODEL = "gemini-2.5-flash"  # Gemini's most capable model
+
+# Shared LLM client, built once so its underlying connection is reused across requests
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def import_llm_sdk():
+    """Import the Gemini SDK (and gRPC); slow, so it can be done in a worker thread ahead of get_llm()"""
+
+    # Deferred so importing this module doesn't pull in the Gemini SDK and gRPC
+    from langchain_google_genai import ChatGoogleGenerativeAI
+
+    return ChatGoogleGenerativeAI
 
 
-# In get_llm() function
 def get_llm():
+    """
+    Get the shared Gemini client, building it on first use.
+
+    Must be called from the event loop's thread: langchain-google-genai only creates
+    its async gRPC client when constructed while a loop is running, and without it
+    every ainvoke/astream falls back to a blocking call in the default executor.
+    """
+    global _llm
+    if _llm is not None:
+        return _llm
+
+    with _llm_lock:
+        if _llm is None:
+            try:
+                ChatGoogleGenerativeAI = import_llm_sdk()
+                
+                _llm = ChatGoogleGenerativeAI(
+                    temperature=0.7,
+                    model=GEMINI_MODEL,
+                    google_api_key=GEMINI_API_KEY,
+                    # gRPC runs over HTTP/2, so concurrent calls share one multiplexed connection
+                    transport="grpc"
+                )
+            except Exception as e:
+                logger.error(f"Error initializing LLM: {str(e)}")
+                raise Exception(f"Failed to initialize AI model: {str(e)}")
+    return _llm
+
+
+# Concurrent LLM prompts are coalesced and dispatched together
+_batcher = BatchedChatModel(get_llm)
+
+
+# Exact-match cache of generated responses (shared via Redis when REDIS_URL is set),
+# plus an index of recent tutoring questions so rephrasings of them also hit it
+_response_cache = create_cache_backend()
+_semantic_index = SemanticIndex()
+
+
+async def clear_response_cache():
+    """
+    Drop every cached tutoring response, quiz and PDF discussion answer.
+    
+    Returns:
+        int: Number of entries removed
+    """
+    cleared = await _response_cache.clear()
+    await _semantic_index.clear()
+    logger.info(f"Cleared {cleared} cached responses")
+    return cleared
+
+
+async def _find_cached_tutoring_response(cache_key, scope, question):
+    """
+    Helper function to look up a tutoring answer, first exactly and then by question similarity.
+    
+    Returns:
+        tuple: Cached response (or None) and the question embedding to index on a miss
+    """
+    cached = await _response_cache.get(cache_key)
+    if cached is not None:
+        return cached, None
+    
     try:
-        return ChatGoogleGenerativeAI(
-            temperature=0.7,
-            model="gemini-2.5-flash",  # Gemini's most capable model
-            google_api_key=GEMINI_API_KEY
-        )
+        embedding = await _semantic_index.embed(question)
     except Exception as e:
-        logger.error(f"Error initializing LLM: {str(e)}")
-        raise Exception(f"Failed to initialize AI model: {str(e)}")
+        logger.warning(f"Skipping semantic cache lookup: {str(e)}")
+        return None, None
     
-def generate_tutoring_response(subject, level, question, learning_style, background, language):
+    similar_key = await _semantic_index.lookup(scope, embedding)
+    if similar_key is not None:
+        cached = await _response_cache.get(similar_key)
+    return cached, embedding
+
+
+async def _store_tutoring_response(cache_key, scope, embedding, response):
+    """Helper function to cache a tutoring answer and index its question"""
+    
+    await _response_cache.set(cache_key, response)
+    if embedding is not None:
+        await _semantic_index.add(scope, embedding, cache_key)
+
+
+async def generate_tutoring_response(subject, level, question, learning_style, background, language):
     """
     Generate a personalized tutoring response based on user preferences.
     
@@ -44,232 +140,577 @@ def generate_tutoring_response(subject, level, question, learning_style, backgro
         str: Formatted tutoring response
     """
     try:
-        # Get LLM instance
-        llm = get_llm()
+        cache_key = make_cache_key("tutor", subject, level, question, learning_style, background, language)
+        scope = make_cache_key("tutor-profile", subject, level, learning_style, background, language)
+        cached, embedding = await _find_cached_tutoring_response(cache_key, scope, question)
+        if cached is not None:
+            logger.info(f"Serving cached tutoring response for subject: {subject}, level: {level}")
+            return cached
         
         # Construct an effective prompt
         prompt = _create_tutoring_prompt(subject, level, question, learning_style, background, language)
         
         # Generate response with error handling
         logger.info(f"Generating tutoring response for subject: {subject}, level: {level}")
-        response = llm([HumanMessage(content=prompt)])
+        response = await _batcher.submit(prompt)
         
         # Post-process the response based on learning style
-        return _format_tutoring_response(response.content, learning_style)
+        formatted = _format_tutoring_response(response.content, learning_style)
+        await _store_tutoring_response(cache_key, scope, embedding, formatted)
+        return formatted
         
+    except LLMOverloadedError:
+        # Passed through as-is so the API can answer 503 with Retry-After
+        raise
     except Exception as e:
         logger.error(f"Error generating tutoring response: {str(e)}")
         raise Exception(f"Failed to generate tutoring response: {str(e)}")
 
 
-
-def _create_tutoring_prompt(subject, level, question, learning_style, background, language):
-    """Helper function to create a well-structured tutoring prompt"""
-    
-    # Build the prompt with all necessary context and instruction
-    prompt = f"""
-    You are an expert tutor in {subject} at the {level} level. 
-    
-    STUDENT PROFILE:
-    - Background knowledge: {background}
-    - Learning style preference: {learning_style}
-    - Language preference: {language}
-    
-    QUESTION:
-    {question}
+async def stream_tutoring_response(subject, level, question, learning_style, background, language):
+    """
+    Stream a personalized tutoring response as the model generates it.
     
-    INSTRUCTIONS:
-    1. Provide a clear, educational explanation that directly addresses the question
-    2. Tailor your explanation to a {background} student at {level} level
-    3. Use {language} as the primary language
-    4. Format your response with appropriate markdown for readability
+    Takes the same arguments as generate_tutoring_response.
     
-    LEARNING STYLE ADAPTATIONS:
-    - For Visual learners: Include descriptions of visual concepts, diagrams, or mental models
-    - For Text-based learners: Provide clear, structured explanations with defined concepts
-    - For Hands-on learners: Include practical examples, exercises, or applications
+    Yields:
+        str: Successive pieces of the formatted tutoring response
     
-    Your explanation should be educational, accurate, and engaging.
+    Raises:
+        LLMOverloadedError: If too many model calls are already waiting
     """
+    try:
+        cache_key = make_cache_key("tutor", subject, level, question, learning_style, background, language)
+        scope = make_cache_key("tutor-profile", subject, level, learning_style, background, language)
+        cached, embedding = await _find_cached_tutoring_response(cache_key, scope, question)
+        if cached is not None:
+            logger.info(f"Serving cached tutoring response for subject: {subject}, level: {level}")
+            yield cached
+            return
+        
+        prompt = _create_tutoring_prompt(subject, level, question, learning_style, background, language)
+        
+        logger.info(f"Streaming tutoring response for subject: {subject}, level: {level}")
+        parts = []
+        async for chunk in _batcher.stream(prompt):
+            if chunk.content:
+                parts.append(chunk.content)
+                yield chunk.content
+        
+        # Send the learning style note last, as in the non-streaming response
+        suffix = _learning_style_suffix(learning_style)
+        if suffix:
+            yield suffix
+        
+        await _store_tutoring_response(cache_key, scope, embedding, "".join(parts) + suffix)
+        
+    except LLMOverloadedError:
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming tutoring response: {str(e)}")
+        raise Exception(f"Failed to stream tutoring response: {str(e)}")
+
+
+
+# Per-style guidance; only the student's own style is sent with the prompt
+_LEARNING_STYLE_HINTS = {
+    "Visual": "Describe visual concepts, diagrams or mental models.",
+    "Text-based": "Give clear, structured explanations with defined concepts.",
+    "Hands-on": "Include practical examples, exercises or applications.",
+}
+
+
+# Static instructions are kept terse since they are paid for on every request
+_TUTOR_TEMPLATE = """You are an expert {subject} tutor at {level} level.
+Student: {background} background, {learning_style} learner, wants answers in {language}.
+
+QUESTION:
+{question}
+
+Answer the question directly with a clear, accurate, engaging explanation pitched at a {background} student at {level} level. Write in {language} using markdown. {style_hint}
+"""
+
+
+def _create_tutoring_prompt(subject, level, question, learning_style, background, language):
+    """Helper function to create a compact tutoring prompt"""
     
-    return prompt
+    style_hint = _LEARNING_STYLE_HINTS.get(learning_style, "")
+    return _TUTOR_TEMPLATE.format_map(locals())
 
 
 
-def _format_tutoring_response(content, learning_style):
-    """Helper function to format the tutoring response based on learning style"""
+def _learning_style_suffix(learning_style):
+    """Helper function to get the closing note appended for a learning style"""
     
     if learning_style == "Visual":
-        return content + "\n\n*Note: Visualize these concepts as you read for better retention.*"
+        return "\n\n*Note: Visualize these concepts as you read for better retention.*"
     elif learning_style == "Hands-on":
-        return content + "\n\n*Tip: Try working through the examples yourself to reinforce your learning.*"
+        return "\n\n*Tip: Try working through the examples yourself to reinforce your learning.*"
     else:
-        return content
-    
+        return ""
 
 
-def _create_quiz_prompt(subject, level, num_questions):
-    """Helper function to create a well-structured quiz generation prompt"""
+def _format_tutoring_response(content, learning_style):
+    """Helper function to format the tutoring response based on learning style"""
+    
+    return content + _learning_style_suffix(learning_style)
     
-    return f"""
+
+
+class QuizQuestionSchema(BaseModel):
+    question: str = Field(..., description="Question text")
+    options: List[str] = Field(..., min_length=4, max_length=4, description="Exactly four answer options")
+    correct_answer: str = Field(..., description="The correct option, copied exactly from options")
+    explanation: str = Field(..., description="Brief explanation of why this answer is correct")
+
+
+class QuizSchema(BaseModel):
+    """Structured output schema the model fills in when generating a quiz"""
+    questions: List[QuizQuestionSchema]
+
+
+_QUIZ_TEMPLATE = """
     Create a {level}-level quiz on {subject} with exactly {num_questions} multiple-choice questions.
     
     INSTRUCTIONS:
     1. Each question should be appropriate for {level} level students
-    2. Each question must have exactly 4 answer options (A, B, C, D)
-    3. Clearly indicate the correct answer
+    2. Each question must have exactly 4 answer options
+    3. The correct answer must be copied exactly from the options
     4. Cover diverse aspects of {subject}
-    
-    FORMAT YOUR RESPONSE AS JSON:
-    ```json
-    [
-        {{
-            "question": "Question text",
-            "options": ["Option A", "Option B", "Option C", "Option D"],
-            "correct_answer": "Option A",
-            "explanation": "Brief explanation of why this answer is correct"
-        }},
-        ...
-    ]
-    ```
-    
-    IMPORTANT: Make sure to return valid JSON that can be parsed. Do not include any text outside the JSON array.
-    Include a brief explanation for each correct answer.
+    5. Include a brief explanation for each correct answer
     """
 
-def _create_fallback_quiz(subject, num_questions):
-    """Helper function to create a fallback quiz if parsing fails"""
+
+def _create_quiz_prompt(subject, level, num_questions):
+    """Helper function to create a well-structured quiz generation prompt"""
     
-    logger.warning(f"Using fallback quiz for {subject}")
+    return _QUIZ_TEMPLATE.format_map(locals())
+
+
+# Shared pieces of the placeholder quiz used when the model doesn't return a valid quiz
+_FALLBACK_OPTIONS = ("Option A", "Option B", "Option C", "Option D")
+_FALLBACK_EXPLANATION = "This is a fallback explanation."
+
+
+@functools.lru_cache(maxsize=32)
+def _fallback_quiz_cached(subject, num_questions):
+    """Helper function to build the fallback quiz once per subject and size"""
     
-    return [
+    return tuple(
         {
             "question": f"Sample {subject} question #{i+1}",
-            "options": ["Option A", "Option B", "Option C", "Option D"],
-            "correct_answer": "Option A",
-            "explanation": "This is a fallback explanation."
+            "options": list(_FALLBACK_OPTIONS),
+            "correct_answer": _FALLBACK_OPTIONS[0],
+            "explanation": _FALLBACK_EXPLANATION
         }
         for i in range(num_questions)
-    ]
+    )
 
-def _validate_quiz_data(quiz_data):
-    """Helper function to validate quiz data structure"""
+
+def _create_fallback_quiz(subject, num_questions):
+    """Helper function to create a fallback quiz if generation fails"""
     
-    if not isinstance(quiz_data, list):
-        raise ValueError("Quiz data must be a list of questions")
+    logger.warning(f"Using fallback quiz for {subject}")
     
-    for question in quiz_data:
-        if not isinstance(question, dict):
-            raise ValueError("Each quiz item must be a dictionary")
-            
-        if not all(key in question for key in ["question", "options", "correct_answer"]):
-            raise ValueError("Each quiz item must have question, options, and correct_answer")
-            
-        if not isinstance(question["options"], list) or len(question["options"]) != 4:
-            raise ValueError("Each question must have exactly 4 options")
-        
+    # The question dicts are shared between calls; callers only read them
+    return list(_fallback_quiz_cached(subject, num_questions))
 
 
-def _parse_quiz_response(response_content, subject, num_questions):
-    """Helper function to parse and validate the quiz response"""
+async def generate_quiz(subject, level, num_questions=5, reveal_answer=True):
+    """
+    Generate a quiz with multiple-choice questions based on subject and level.
+    
+    Args:
+        subject (str): The academic subject
+        level (str): Learning level (Beginner, Intermediate, Advanced)
+        num_questions (int): Number of questions to generate
+        reveal_answer (bool): Whether to format the response with hidden answers that can be revealed
     
+    Returns:
+        dict: Contains quiz data (list of questions), formatted HTML if reveal_answer is True,
+            and whether the placeholder fallback quiz was used
+    """
     try:
-        # Try to find JSON content using regex
-        json_match = re.search(r'```json\s*(\[[\s\S]*?\])\s*```', response_content)
+        # Reuse a previously parsed quiz for the same request when available
+        cache_key = make_cache_key("quiz", subject, level, num_questions)
+        quiz_data = await _response_cache.get(cache_key)
+        is_fallback = False
         
-        if json_match:
-            # Extract JSON from code block
-            quiz_json = json_match.group(1)
+        if quiz_data is not None:
+            logger.info(f"Serving cached quiz for subject: {subject}, level: {level}, questions: {num_questions}")
         else:
-            # Try to find raw JSON array
-            json_match = re.search(r'\[\s*\{.*\}\s*\]', response_content, re.DOTALL)
-            if json_match:
-                quiz_json = json_match.group(0)
+            # Create a structured prompt for quiz generation
+            prompt = _create_quiz_prompt(subject, level, num_questions)
+            
+            # Generate a schema-validated quiz through structured output
+            logger.info(f"Generating quiz for subject: {subject}, level: {level}, questions: {num_questions}")
+            try:
+                quiz = await _batcher.submit(prompt, schema=QuizSchema)
+            except (OutputParserException, ValidationError) as e:
+                logger.error(f"Model returned an invalid quiz: {str(e)}")
+                quiz = None
+            
+            # Fall back to a placeholder quiz (never cached) if the model didn't produce one
+            if quiz is None or not quiz.questions:
+                quiz_data = _create_fallback_quiz(subject, num_questions)
+                is_fallback = True
             else:
-                # Assume the entire response is JSON
-                quiz_json = response_content
+                quiz_data = [question.model_dump() for question in quiz.questions[:num_questions]]
+                await _response_cache.set(cache_key, quiz_data)
         
-        # Parse the JSON
-        quiz_data = json.loads(quiz_json)
+        # Format the quiz with hidden answers if requested
+        if reveal_answer:
+            formatted_quiz = _format_quiz_with_reveal(quiz_data)
+            return {
+                "quiz_data": quiz_data,
+                "formatted_quiz": formatted_quiz,
+                "is_fallback": is_fallback
+            }
+        else:
+            return {
+                "quiz_data": quiz_data,
+                "is_fallback": is_fallback
+            }
         
-        # Validate the data structure
-        _validate_quiz_data(quiz_data)
+    except LLMOverloadedError:
+        # Passed through as-is so the API can answer 503 with Retry-After
+        raise
+    except Exception as e:
+        logger.error(f"Error generating quiz: {str(e)}")
+        raise Exception(f"Failed to generate quiz: {str(e)}")
+    
+
+async def generate_pdf_discussion_response(question, pdf_content, pdf_summary):
+    """
+    Answer a question using only the content of an uploaded PDF.
+    
+    Args:
+        question (str): User's question about the PDF
+        pdf_content (str): Extracted PDF text
+        pdf_summary (str): Summary generated for the PDF
+    
+    Returns:
+        str: Answer grounded in the PDF content
+    """
+    try:
+        # Scope the cache to the document so identical questions on different PDFs don't collide
+        content_hash = hashlib.sha256(pdf_content.encode()).hexdigest()
+        summary_hash = hashlib.sha256(pdf_summary.encode()).hexdigest()
+        cache_key = make_cache_key("discuss", content_hash, summary_hash, question)
         
-        # Ensure we have the requested number of questions
-        if len(quiz_data) > num_questions:
-            quiz_data = quiz_data[:num_questions]
+        cached = await _response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Serving cached PDF discussion response")
+            return cached
         
-        # Add explanation field if missing
-        for question in quiz_data:
-            if "explanation" not in question:
-                question["explanation"] = f"The correct answer is {question['correct_answer']}."
+        prompt = _create_discussion_prompt(question, pdf_content, pdf_summary)
         
-        return quiz_data
+        logger.info("Generating PDF discussion response")
+        response = await _batcher.submit(prompt)
         
-    except (json.JSONDecodeError, ValueError) as e:
-        logger.error(f"Error parsing quiz response: {str(e)}")
+        await _response_cache.set(cache_key, response.content)
+        return response.content
         
-        # Create a fallback quiz if parsing fails
-        return _create_fallback_quiz(subject, num_questions)
+    except LLMOverloadedError:
+        # Passed through as-is so the API can answer 503 with Retry-After
+        raise
+    except Exception as e:
+        logger.error(f"Error generating PDF discussion response: {str(e)}")
+        raise Exception(f"Failed to generate PDF discussion response: {str(e)}")
+
+
+# Static rules shared by every discussion prompt; kept byte-identical so it forms a
+# stable prefix for Gemini's implicit context caching
+_DISCUSSION_RULES = """
+    You are a helpful study assistant that can ONLY answer questions based on the provided PDF content.
+    
+    IMPORTANT RULES:
+    1. ONLY answer questions using information from the PDF content provided
+    2. If the question cannot be answered from the PDF content, say "I can only answer questions based on the content of your uploaded PDF. This question cannot be answered from the information available in your document."
+    3. Do NOT use any external knowledge or general information
+    4. Base your answers ONLY on the PDF content and summary provided
+    5. Be helpful and educational, but stay within the bounds of the PDF content
+    
+    INSTRUCTIONS:
+    - Analyze the question carefully
+    - Search through the PDF content for relevant information
+    - Provide a clear, helpful answer based ONLY on the PDF content
+    - If the PDF doesn't contain enough information to answer the question, politely explain this limitation
+    - Use the PDF content to provide specific examples, definitions, or explanations when possible
+    
+    Your response should be educational, clear, and strictly based on the PDF content provided."""
+
+
+def _create_discussion_prompt(question, pdf_content, pdf_summary):
+    """Helper function to create a prompt that only allows answers based on PDF content"""
     
+    # Rules, then the document, then the question: follow-up questions on the same
+    # PDF share everything before the question as a cacheable prefix
+    return (
+        _DISCUSSION_RULES
+        + "\n\nPDF CONTENT:\n" + pdf_content
+        + "\n\nPDF SUMMARY:\n" + pdf_summary
+        + "\n\nUSER QUESTION:\n" + question
+    )
 
 
+class FlashcardSchema(BaseModel):
+    topic: str = Field(..., description="The main subject area or category")
+    question: str = Field(..., description="A specific, focused question about the concept")
+    answer: str = Field(..., description="A clear explanation of the concept, 2-3 sentences minimum")
 
-def generate_quiz(subject, level, num_questions=5, reveal_answer=True):
+
+class PDFAnalysisSchema(BaseModel):
+    """Structured output schema the model fills in when analyzing an uploaded PDF"""
+    summary: str = Field(..., description="Structured summary of the PDF with headings and bullet points")
+    flashcards: List[FlashcardSchema] = Field(..., min_length=1, description="10-15 flashcards covering the whole PDF")
+
+
+# Static instructions come first and the document last, so requests share a prompt
+# prefix that Gemini's implicit context caching can reuse
+_PDF_ANALYSIS_TEMPLATE = """
+    Analyze the PDF content below, then summarize it and turn it into study flashcards.
+    
+    SUMMARY:
+    1. Provide a clear, structured summary of the main topics and key points
+    2. Highlight any key definitions, formulas, or important facts
+    3. Keep it concise but comprehensive (around 200-300 words), with headings and bullet points
+    
+    FLASHCARDS:
+    1. Create 10-15 flashcards (or more if needed) that cover ALL major sections and themes
+    2. Each flashcard should focus on a specific, distinct concept or topic
+    3. Include key definitions, principles, formulas, dates or events, processes, examples and theories
+    4. Each answer should be a clear explanation of at least 2-3 sentences
+    
+    PDF CONTENT:
+    {pdf_text}
     """
-    Generate a quiz with multiple-choice questions based on subject and level.
+
+# Most PDF text sent to the model in one prompt
+PDF_TOKEN_BUDGET = 8000
+# Rough characters per token, used only if the tokenizer can't be reached
+_CHARS_PER_TOKEN_ESTIMATE = 4
+
+
+async def _truncate_to_token_budget(text, budget=PDF_TOKEN_BUDGET):
+    """Helper function to trim text to about `budget` tokens as counted by Gemini's tokenizer"""
+    
+    try:
+        # The client is fetched here, on the event loop, so it is never first built in the worker thread
+        llm = get_llm()
+        token_count = await asyncio.to_thread(llm.get_num_tokens, text)
+    except Exception as e:
+        logger.warning(f"Could not count tokens, estimating instead: {str(e)}")
+        token_count = len(text) / _CHARS_PER_TOKEN_ESTIMATE
+    
+    if token_count <= budget:
+        return text
+    
+    # Cut proportionally, then back off to a word boundary
+    truncated = text[:int(len(text) * budget / token_count)]
+    return truncated.rsplit(None, 1)[0] if " " in truncated else truncated
+
+
+def _create_pdf_analysis_prompt(pdf_text):
+    """Helper function to create the combined summary and flashcards prompt"""
+    
+    return _PDF_ANALYSIS_TEMPLATE.format(pdf_text=pdf_text)
+
+
+async def generate_pdf_analysis(pdf_text):
+    """
+    Summarize a PDF and generate flashcards for it in a single model call.
     
     Args:
-        subject (str): The academic subject
-        level (str): Learning level (Beginner, Intermediate, Advanced)
-        num_questions (int): Number of questions to generate
-        reveal_answer (bool): Whether to format the response with hidden answers that can be revealed
+        pdf_text (str): Extracted PDF text to analyze, trimmed to PDF_TOKEN_BUDGET tokens
     
     Returns:
-        dict: Contains quiz data (list of questions) and formatted HTML if reveal_answer is True
+        dict: Contains the summary (str) and flashcards (list of topic/question/answer dicts)
     """
     try:
-        # Get LLM instance
-        llm = get_llm()
+        # The same document uploaded again gets the same analysis
+        cache_key = make_cache_key("pdf-analysis", hashlib.sha256(pdf_text.encode()).hexdigest())
+        cached = await _response_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Serving cached PDF analysis")
+            return cached
         
-        # Create a structured prompt for quiz generation
-        prompt = _create_quiz_prompt(subject, level, num_questions)
+        prompt = _create_pdf_analysis_prompt(await _truncate_to_token_budget(pdf_text))
         
-        # Generate response
-        logger.info(f"Generating quiz for subject: {subject}, level: {level}, questions: {num_questions}")
-        response = llm([HumanMessage(content=prompt)])
+        logger.info("Generating PDF summary and flashcards")
+        analysis = await _batcher.submit(prompt, schema=PDFAnalysisSchema)
+        if analysis is None:
+            raise ValueError("Model returned no analysis")
         
-        # Parse and validate the response
-        quiz_data = _parse_quiz_response(response.content, subject, num_questions)
+        result = analysis.model_dump()
+        await _response_cache.set(cache_key, result)
+        return result
         
-        # Format the quiz with hidden answers if requested
-        if reveal_answer:
-            formatted_quiz = _format_quiz_with_reveal(quiz_data)
-            return {
-                "quiz_data": quiz_data,
-                "formatted_quiz": formatted_quiz
+    except LLMOverloadedError:
+        # Passed through as-is so the API can answer 503 with Retry-After
+        raise
+    except Exception as e:
+        logger.error(f"Error generating PDF analysis: {str(e)}")
+        raise Exception(f"Failed to generate PDF analysis: {str(e)}")
+
+
+# Gemini response schema for batch requests, mirroring PDFAnalysisSchema
+_PDF_ANALYSIS_RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "summary": {"type": "STRING"},
+        "flashcards": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "topic": {"type": "STRING"},
+                    "question": {"type": "STRING"},
+                    "answer": {"type": "STRING"}
+                },
+                "required": ["topic", "question", "answer"]
             }
-        else:
-            return {
-                "quiz_data": quiz_data
+        }
+    },
+    "required": ["summary", "flashcards"]
+}
+
+_BATCH_FINISHED_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+_batch_client = None
+_batch_client_lock = threading.Lock()
+
+
+def _get_batch_client():
+    """Helper function to lazily create the google-genai client used for Batch Mode"""
+
+    global _batch_client
+    with _batch_client_lock:
+        if _batch_client is None:
+            # Only needed for batch jobs
+            from google import genai
+
+            _batch_client = genai.Client(api_key=GEMINI_API_KEY)
+    return _batch_client
+
+
+def _batch_request_line(key, pdf_text):
+    """Helper function to encode one PDF analysis as a Batch Mode JSONL line"""
+
+    return json.dumps({
+        "key": key,
+        "request": {
+            "contents": [{"parts": [{"text": _create_pdf_analysis_prompt(pdf_text)}]}],
+            "generation_config": {
+                "response_mime_type": "application/json",
+                "response_schema": _PDF_ANALYSIS_RESPONSE_SCHEMA
             }
+        }
+    })
+
+
+def _parse_batch_results(results_jsonl):
+    """Helper function to turn a finished job's JSONL output into per-file analyses"""
+
+    results = {}
+    for line in results_jsonl.splitlines():
+        if not line.strip():
+            continue
+        entry = json.loads(line)
+        try:
+            text = entry["response"]["candidates"][0]["content"]["parts"][0]["text"]
+            results[entry["key"]] = PDFAnalysisSchema.model_validate_json(text).model_dump()
+        except (KeyError, IndexError, ValidationError) as e:
+            error = entry.get("error", {}).get("message") or str(e)
+            results[entry["key"]] = {"error": f"Failed to generate PDF analysis: {error}"}
+    return results
+
+
+async def submit_pdf_analysis_batch(documents):
+    """
+    Submit PDF analyses to Gemini Batch Mode, for bulk work that can wait.
+    
+    Batch jobs run asynchronously at half the interactive price and are not
+    subject to the per-minute request limit; poll get_pdf_analysis_batch
+    for the results.
+    
+    Args:
+        documents (list): (filename, pdf_text) pairs to analyze; each text is trimmed to PDF_TOKEN_BUDGET tokens
+    
+    Returns:
+        dict: Contains the job id, its initial state, and the filenames submitted
+    """
+    try:
+        client = _get_batch_client()
+        
+        filenames = [filename for filename, _ in documents]
+        pdf_texts = await asyncio.gather(*(_truncate_to_token_budget(pdf_text) for _, pdf_text in documents))
+        # Filenames may repeat, so key each request by its position
+        jsonl = "\n".join(_batch_request_line(str(index), pdf_text) for index, pdf_text in enumerate(pdf_texts))
+        
+        job_id = uuid.uuid4().hex
+        uploaded = await client.aio.files.upload(
+            file=io.BytesIO(jsonl.encode()),
+            config={"display_name": f"studygenie-{job_id}", "mime_type": "jsonl"}
+        )
+        batch = await client.aio.batches.create(
+            model=GEMINI_MODEL,
+            src=uploaded.name,
+            config={"display_name": f"studygenie-{job_id}"}
+        )
+        
+        logger.info(f"Submitted batch {batch.name} with {len(documents)} PDF(s)")
+        await asyncio.to_thread(batch_store.save_job, job_id, batch.name, filenames, batch.state.name)
+        return {"job_id": job_id, "state": batch.state.name, "files": filenames}
         
     except Exception as e:
-        logger.error(f"Error generating quiz: {str(e)}")
-        raise Exception(f"Failed to generate quiz: {str(e)}")
-    
+        logger.error(f"Error submitting PDF batch: {str(e)}")
+        raise Exception(f"Failed to submit PDF batch: {str(e)}")
 
-def _format_quiz_with_reveal(quiz_data):
+
+async def get_pdf_analysis_batch(job_id):
     """
-    Format quiz data into HTML with hidden answers that can be revealed on click.
+    Check on a batch job, collecting its results once it has finished.
     
     Args:
-        quiz_data (list): List of question dictionaries
-        
+        job_id (str): Id returned by submit_pdf_analysis_batch
+    
     Returns:
-        str: HTML string with quiz questions and hidden answers
+        dict or None: Job state and files, plus per-file results once finished; None for unknown ids
     """
-    html = """
+    job = await asyncio.to_thread(batch_store.get_job, job_id)
+    if job is None:
+        return None
+    
+    try:
+        # Finished jobs are served from the store without asking Gemini again
+        if job["state"] not in _BATCH_FINISHED_STATES:
+            client = _get_batch_client()
+            batch = await client.aio.batches.get(name=job["batch_name"])
+            job["state"] = batch.state.name
+            
+            if job["state"] == "JOB_STATE_SUCCEEDED":
+                results_jsonl = await client.aio.files.download(file=batch.dest.file_name)
+                parsed = _parse_batch_results(results_jsonl.decode())
+                job["results"] = [parsed.get(str(index)) for index in range(len(job["filenames"]))]
+            
+            if job["state"] in _BATCH_FINISHED_STATES:
+                await asyncio.to_thread(batch_store.update_job, job_id, job["state"], job["results"])
+        
+        return {
+            "job_id": job_id,
+            "state": job["state"],
+            "files": job["filenames"],
+            "results": job["results"]
+        }
+        
+    except Exception as e:
+        logger.error(f"Error checking PDF batch: {str(e)}")
+        raise Exception(f"Failed to check PDF batch: {str(e)}")
+
+
+# Static parts of the quiz page, shared by every rendered quiz
+_QUIZ_HTML_HEAD = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -371,40 +812,8 @@ def _format_quiz_with_reveal(quiz_data):
         <div class="quiz-container">
             <h2 style="color: #2196f3; text-align: center; margin-bottom: 30px;">Interactive Quiz</h2>
     """
-    
-    for i, question in enumerate(quiz_data, 1):
-        option_letters = ["A", "B", "C", "D"]
-        correct_index = question["options"].index(question["correct_answer"]) if question["correct_answer"] in question["options"] else 0
-        
-        html += f"""
-            <div class="question" id="question-{i}">
-                <h3>Question {i}</h3>
-                <p>{question["question"]}</p>
-                <div class="options">
-        """
-        
-        for j, option in enumerate(question["options"]):
-            is_correct = j == correct_index
-            html += f"""
-                    <div class="option" id="option-{i}-{j}" onclick="selectOption({i}, {j}, {is_correct})">
-                        <strong>{option_letters[j]}.</strong> {option}
-                    </div>
-            """
-        
-        html += f"""
-                </div>
-                <button class="reveal-btn" onclick="revealAnswer({i})">SHOW ANSWER</button>
-                <div class="answer-section" id="answer-{i}">
-                    <div class="answer-header">CORRECT ANSWER</div>
-                    <div class="answer-content">
-                        <div class="correct-answer">{option_letters[correct_index]}. {question["correct_answer"]}</div>
-                        <div class="explanation">{question.get("explanation", "")}</div>
-                    </div>
-                </div>
-            </div>
-        """
-    
-    html += """
+
+_QUIZ_HTML_TAIL = """
         </div>
         <script>
             function selectOption(questionNum, optionNum, isCorrect) {
@@ -450,8 +859,56 @@ def _format_quiz_with_reveal(quiz_data):
     </body>
     </html>
     """
+
+
+def _format_quiz_with_reveal(quiz_data):
+    """
+    Format quiz data into HTML with hidden answers that can be revealed on click.
+    
+    Args:
+        quiz_data (list): List of question dictionaries
+        
+    Returns:
+        str: HTML string with quiz questions and hidden answers
+    """
+    # Collect the page's pieces and join once rather than growing one string
+    parts = [_QUIZ_HTML_HEAD]
+    
+    for i, question in enumerate(quiz_data, 1):
+        option_letters = ["A", "B", "C", "D"]
+        correct_index = question["options"].index(question["correct_answer"]) if question["correct_answer"] in question["options"] else 0
+        
+        parts.append(f"""
+            <div class="question" id="question-{i}">
+                <h3>Question {i}</h3>
+                <p>{question["question"]}</p>
+                <div class="options">
+        """)
+        
+        for j, option in enumerate(question["options"]):
+            is_correct = j == correct_index
+            parts.append(f"""
+                    <div class="option" id="option-{i}-{j}" onclick="selectOption({i}, {j}, {is_correct})">
+                        <strong>{option_letters[j]}.</strong> {option}
+                    </div>
+            """)
+        
+        parts.append(f"""
+                </div>
+                <button class="reveal-btn" onclick="revealAnswer({i})">SHOW ANSWER</button>
+                <div class="answer-section" id="answer-{i}">
+                    <div class="answer-header">CORRECT ANSWER</div>
+                    <div class="answer-content">
+                        <div class="correct-answer">{option_letters[correct_index]}. {question["correct_answer"]}</div>
+                        <div class="explanation">{question.get("explanation", "")}</div>
+                    </div>
+                </div>
+            </div>
+        """)
+    
+    parts.append(_QUIZ_HTML_TAIL)
     
-    return html
+    return "".join(parts)
 
 # Export quiz to file (new function)
 def export_quiz_to_html(quiz_data, file_path="quiz.html"):
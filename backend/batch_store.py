@@ -0,0 +1,72 @@
+import json
+import os
+import sqlite3
+import time
+
+
+BATCH_DB_PATH = os.getenv("BATCH_DB_PATH", "batch_jobs.db")
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS batch_jobs (
+        job_id TEXT PRIMARY KEY,
+        batch_name TEXT NOT NULL,
+        filenames TEXT NOT NULL,
+        state TEXT NOT NULL,
+        results TEXT,
+        created_at REAL NOT NULL
+    )
+"""
+
+
+def _connect():
+    """Helper function to open the job database, creating the table on first use"""
+
+    connection = sqlite3.connect(BATCH_DB_PATH)
+    connection.row_factory = sqlite3.Row
+    connection.execute(_SCHEMA)
+    return connection
+
+
+def save_job(job_id, batch_name, filenames, state):
+    """
+    Record a newly submitted batch job.
+
+    Args:
+        job_id (str): Public id clients poll with
+        batch_name (str): Gemini batch resource name (e.g. "batches/abc123")
+        filenames (list): Names of the PDFs in the batch, in request order
+        state (str): Initial job state reported by Gemini
+    """
+    with _connect() as connection:
+        connection.execute(
+            "INSERT INTO batch_jobs (job_id, batch_name, filenames, state, created_at) VALUES (?, ?, ?, ?, ?)",
+            (job_id, batch_name, json.dumps(filenames), state, time.time())
+        )
+
+
+def get_job(job_id):
+    """
+    Look up a batch job.
+
+    Returns:
+        dict or None: The job's stored fields, with filenames and results decoded
+    """
+    with _connect() as connection:
+        row = connection.execute("SELECT * FROM batch_jobs WHERE job_id = ?", (job_id,)).fetchone()
+
+    if row is None:
+        return None
+    job = dict(row)
+    job["filenames"] = json.loads(job["filenames"])
+    job["results"] = json.loads(job["results"]) if job["results"] else None
+    return job
+
+
+def update_job(job_id, state, results=None):
+    """Record a job's latest state and, once it has finished, its results"""
+
+    with _connect() as connection:
+        connection.execute(
+            "UPDATE batch_jobs SET state = ?, results = ? WHERE job_id = ?",
+            (state, json.dumps(results) if results is not None else None, job_id)
+        )
@@ -0,0 +1,205 @@
+import asyncio
+import logging
+import math
+import random
+
+
+logger = logging.getLogger(__name__)
+
+
+def _retryable_errors():
+    """
+    Helper function returning the errors Gemini raises when it is rate limiting or briefly unavailable.
+
+    Only called from `except` clauses, so google.api_core (which loads gRPC) is imported
+    once a model call has actually failed rather than when this module is imported.
+    """
+    from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+
+    return (ResourceExhausted, ServiceUnavailable)
+
+
+class LLMOverloadedError(Exception):
+    """Raised instead of queueing a prompt when too many are already waiting for the model."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many requests are waiting for the AI model; retry in {retry_after} seconds")
+        self.retry_after = retry_after
+
+
+
+class BatchedChatModel:
+    """
+    Coalesce prompts submitted within a short window and dispatch them together.
+
+    Prompts are queued until either `max_batch_size` of them are waiting or
+    `flush_interval` seconds have passed, then sent concurrently with
+    `asyncio.gather`. A shared semaphore bounds the number of in-flight
+    model calls across all batches. Calls that are rate limited (429) or hit a
+    briefly unavailable model are retried with jittered exponential backoff, and
+    new prompts are rejected once `max_queue_depth` are already waiting.
+
+    Args:
+        llm_factory (callable): Returns the chat model used to run prompts
+        max_batch_size (int): Queue length that triggers an immediate flush
+        flush_interval (float): Seconds to wait for more prompts before flushing
+        max_concurrency (int): Maximum number of model calls in flight at once
+        max_queue_depth (int): Prompts allowed to wait for a free slot before new ones are rejected
+        max_retries (int): Retries for a rate-limited or unavailable model call
+        backoff_base (float): Seconds to wait before the first retry; doubled on each attempt
+    """
+
+    def __init__(self, llm_factory, max_batch_size=16, flush_interval=0.02, max_concurrency=250,
+                 max_queue_depth=1000, max_retries=3, backoff_base=1.0):
+        self._llm_factory = llm_factory
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._outstanding = 0
+        self._pending = []
+        self._flush_handle = None
+        self._tasks = set()
+        self._structured_models = {}
+
+    async def submit(self, prompt, schema=None):
+        """
+        Queue a prompt for the next batch and wait for its response.
+
+        Args:
+            prompt: Anything accepted by the chat model's `ainvoke`
+            schema (type, optional): Pydantic model to request structured output for
+
+        Returns:
+            The model response for this prompt, or an instance of `schema` if given
+
+        Raises:
+            LLMOverloadedError: If `max_queue_depth` prompts are already waiting for a slot
+        """
+        self._check_capacity()
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((prompt, schema, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.flush_interval, self._flush)
+
+        self._outstanding += 1
+        try:
+            return await future
+        finally:
+            self._outstanding -= 1
+
+    async def stream(self, prompt):
+        """
+        Stream a prompt's response as the model generates it.
+
+        Streams bypass the batch window but share its limits: a concurrency slot
+        is held for the whole stream, rate-limited or unavailable calls are retried
+        as long as nothing has been yielded yet, and new streams are rejected once
+        `max_queue_depth` callers are already waiting.
+
+        Args:
+            prompt: Anything accepted by the chat model's `astream`
+
+        Yields:
+            The model's response chunks
+
+        Raises:
+            LLMOverloadedError: If `max_queue_depth` callers are already waiting for a slot
+        """
+        self._check_capacity()
+
+        self._outstanding += 1
+        try:
+            for attempt in range(self.max_retries + 1):
+                started = False
+                try:
+                    async with self._semaphore:
+                        async for chunk in self._llm_factory().astream(prompt):
+                            started = True
+                            yield chunk
+                    return
+                except _retryable_errors() as e:
+                    # Chunks already sent can't be taken back, so only a stream that hasn't started is retried
+                    if started or attempt == self.max_retries:
+                        raise
+                    await self._backoff(attempt, e)
+        finally:
+            self._outstanding -= 1
+
+    def _check_capacity(self):
+        """Helper function to reject a new caller once too many are waiting for the model"""
+
+        # Fail fast rather than letting callers queue indefinitely behind a rate-limited model
+        if self._outstanding >= self.max_concurrency + self.max_queue_depth:
+            raise LLMOverloadedError(retry_after=math.ceil(self.backoff_base * 2 ** self.max_retries))
+
+    async def _backoff(self, attempt, error):
+        """Helper function to wait before retrying a rate-limited or unavailable model call"""
+
+        # Jitter keeps callers that were throttled together from retrying together;
+        # the slot is released while waiting so other prompts can use it
+        delay = self.backoff_base * 2 ** attempt * random.uniform(0.75, 1.25)
+        logger.warning(f"Model call failed ({type(error).__name__}), retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+
+    def _flush(self):
+        """Helper function to hand the queued prompts to a dispatch task"""
+
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        # Keep a reference so the task isn't garbage collected mid-flight
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        """Helper function to run one batch and resolve each caller's future"""
+
+        logger.info(f"Dispatching batch of {len(batch)} prompt(s)")
+        llm = self._llm_factory()
+        results = await asyncio.gather(
+            *(self._invoke(self._runnable_for(llm, schema), prompt) for prompt, schema, _ in batch),
+            return_exceptions=True
+        )
+
+        for (_, _, future), result in zip(batch, results):
+            # The caller may have gone away (e.g. client disconnected)
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def _runnable_for(self, llm, schema):
+        """Helper function to get the (cached) structured-output runnable for a schema"""
+
+        if schema is None:
+            return llm
+        if schema not in self._structured_models:
+            self._structured_models[schema] = llm.with_structured_output(schema)
+        return self._structured_models[schema]
+
+    async def _invoke(self, runnable, prompt):
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self._semaphore:
+                    return await runnable.ainvoke(prompt)
+            except _retryable_errors() as e:
+                if attempt == self.max_retries:
+                    raise
+                await self._backoff(attempt, e)
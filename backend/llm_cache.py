@@ -0,0 +1,201 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Optional, Protocol
+
+import numpy as np
+import orjson
+from cachetools import TTLCache
+
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL_SECONDS = 3600
+CACHE_MAX_ENTRIES = 10000
+
+# Cosine similarity above which two questions are treated as the same question
+SEMANTIC_SIMILARITY_THRESHOLD = 0.92
+SEMANTIC_INDEX_SIZE = 1000
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+
+def _normalize(value):
+    """Helper function to collapse whitespace so trivially different requests share a key"""
+
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def make_cache_key(kind, *args):
+    """
+    Build an exact-match cache key from a request's arguments.
+
+    Args:
+        kind (str): Namespace for the request type (e.g. "tutor", "quiz")
+        *args: JSON-serializable request arguments
+
+    Returns:
+        str: SHA-256 hex digest of the normalized arguments
+    """
+    payload = json.dumps([kind, *(_normalize(arg) for arg in args)], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CacheBackend(Protocol):
+    """Storage used for cached LLM responses."""
+
+    async def get(self, key: str) -> Optional[Any]: ...
+
+    async def set(self, key: str, value: Any) -> None: ...
+
+    async def clear(self) -> int: ...
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with a TTL, private to each worker."""
+
+    def __init__(self, maxsize=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = asyncio.Lock()
+
+    async def get(self, key):
+        async with self._lock:
+            return self._cache.get(key)
+
+    async def set(self, key, value):
+        async with self._lock:
+            self._cache[key] = value
+
+    async def clear(self):
+        async with self._lock:
+            cleared = len(self._cache)
+            self._cache.clear()
+        return cleared
+
+
+class RedisCacheBackend:
+    """Redis-backed cache shared by every worker; values are stored as JSON."""
+
+    def __init__(self, url, ttl=CACHE_TTL_SECONDS, prefix="studygenie:llm:"):
+        # Only needed when REDIS_URL is configured
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url)
+        self._ttl = ttl
+        self._prefix = prefix
+
+    async def get(self, key):
+        value = await self._redis.get(self._prefix + key)
+        return orjson.loads(value) if value is not None else None
+
+    async def set(self, key, value):
+        await self._redis.set(self._prefix + key, orjson.dumps(value), ex=self._ttl)
+
+    async def clear(self):
+        cleared = 0
+        async for key in self._redis.scan_iter(match=self._prefix + "*"):
+            cleared += await self._redis.delete(key)
+        return cleared
+
+
+def create_cache_backend(ttl=CACHE_TTL_SECONDS, prefix="studygenie:llm:", maxsize=CACHE_MAX_ENTRIES):
+    """
+    Create the response cache backend: Redis when REDIS_URL is set, otherwise in-memory.
+
+    Args:
+        ttl (int): Seconds an entry is kept
+        prefix (str): Redis key prefix, so separate stores can be cleared independently
+        maxsize (int): Entries the in-memory backend keeps before evicting the least recently used
+
+    Returns:
+        CacheBackend: The configured backend
+    """
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        logger.info("Using Redis response cache")
+        return RedisCacheBackend(redis_url, ttl=ttl, prefix=prefix)
+    return MemoryCacheBackend(maxsize=maxsize, ttl=ttl)
+
+
+class SemanticIndex:
+    """
+    Embeddings of recently answered questions, used to find near-duplicates.
+
+    Each entry records the exact cache key holding its answer and a scope
+    (e.g. the rest of the student profile), so a question only matches
+    earlier questions asked in the same scope.
+    """
+
+    def __init__(self, threshold=SEMANTIC_SIMILARITY_THRESHOLD, size=SEMANTIC_INDEX_SIZE):
+        self.threshold = threshold
+        self.size = size
+        self._embeddings = None
+        self._scopes = np.empty(0, dtype=object)
+        self._keys = []
+        self._embedder = None
+        self._embedder_lock = threading.Lock()
+        self._lock = asyncio.Lock()
+
+    def _get_embedder(self):
+        with self._embedder_lock:
+            if self._embedder is None:
+                from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+                self._embedder = GoogleGenerativeAIEmbeddings(
+                    model=EMBEDDING_MODEL,
+                    google_api_key=os.getenv("GEMINI_API_KEY")
+                )
+        return self._embedder
+
+    async def embed(self, text):
+        """
+        Embed text as a unit vector so a dot product gives cosine similarity.
+
+        Args:
+            text (str): Text to embed
+
+        Returns:
+            numpy.ndarray: Normalized embedding
+        """
+        vector = np.asarray(await self._get_embedder().aembed_query(_normalize(text)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    async def lookup(self, scope, embedding):
+        """
+        Find the cache key of the most similar earlier question in the same scope.
+
+        Returns:
+            str or None: Cache key of the match, if its similarity clears the threshold
+        """
+        async with self._lock:
+            if self._embeddings is None:
+                return None
+            similarities = np.where(self._scopes == scope, self._embeddings @ embedding, -1.0)
+            best_index = int(np.argmax(similarities))
+            if similarities[best_index] < self.threshold:
+                return None
+            logger.info(f"Semantic cache match with similarity {similarities[best_index]:.3f}")
+            return self._keys[best_index]
+
+    async def add(self, scope, embedding, key):
+        """Record an answered question, evicting the oldest once the index is full"""
+
+        async with self._lock:
+            row = embedding[np.newaxis, :]
+            if self._embeddings is None:
+                self._embeddings = row
+            else:
+                self._embeddings = np.vstack([self._embeddings, row])[-self.size:]
+            self._scopes = np.append(self._scopes, np.array([scope], dtype=object))[-self.size:]
+            self._keys = (self._keys + [key])[-self.size:]
+
+    async def clear(self):
+        async with self._lock:
+            self._embeddings = None
+            self._scopes = np.empty(0, dtype=object)
+            self._keys = []
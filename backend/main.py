@@ -1,75 +1,220 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Depends, Header, Request, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
+import msgspec
+from msgspec import Meta
+import asyncio
+import hashlib
+import logging
 import os
-from typing import List, Dict, Any, Optional
+import secrets
+import zlib
+from typing import Annotated, List, Dict, Any, Optional
 from dotenv import load_dotenv
-import PyPDF2
-import io
-from langchain_core.messages import HumanMessage
 
 
-from ai_engine import generate_tutoring_response, generate_quiz
+from ai_engine import (
+    get_llm,
+    import_llm_sdk,
+    generate_tutoring_response,
+    stream_tutoring_response,
+    generate_quiz,
+    generate_pdf_discussion_response,
+    generate_pdf_analysis,
+    submit_pdf_analysis_batch,
+    get_pdf_analysis_batch,
+    clear_response_cache,
+)
+from llm_batch import LLMOverloadedError
+from llm_cache import CACHE_TTL_SECONDS, create_cache_backend, make_cache_key
+from pdf_utils import create_process_pool, extract_pdf_text, pdf_content_hash
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Extraction stops after this much text; ai_engine trims it further to the model's token budget
+MAX_PDF_TEXT_CHARS = 32000
+
+async def _warm_up_llm():
+    """Helper function to build the shared Gemini client ahead of the first request"""
+    
+    # ai_engine keeps the client module-wide (get_llm() and its batcher), so building it
+    # here is all that's needed; it isn't stored on app.state
+    try:
+        # The slow SDK import runs in a worker thread, but the client is built on the
+        # event loop, where langchain-google-genai sets up its async gRPC client
+        await asyncio.to_thread(import_llm_sdk)
+        get_llm()
+    except Exception as e:
+        logger.warning(f"AI model not initialized at startup: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One PDF extraction pool for the life of the app, rather than per request
+    app.state.pdf_pool = create_process_pool()
+    
+    # Build the shared Gemini client (and import its SDK) in the background, so the
+    # first request doesn't pay for it but startup and /health don't wait on it either
+    app.state.llm_warm_up = asyncio.create_task(_warm_up_llm())
+    
+    try:
+        yield
+    finally:
+        app.state.pdf_pool.shutdown(wait=False, cancel_futures=True)
+
+
+# Finished /process_pdf results, keyed by a hash of the uploaded file, so re-uploads are free
+_processed_pdf_cache = create_cache_backend()
+
+# Extracted text and summary of each processed PDF, keyed by the pdf_id handed to the
+# client, so /discuss_pdf requests only need to carry the id
+PDF_STORE_TTL_SECONDS = 24 * 3600
+# Each entry holds up to MAX_PDF_TEXT_CHARS of text, so without Redis only the most
+# recently used few hundred are kept per worker
+PDF_STORE_MAX_ENTRIES = int(os.getenv("PDF_STORE_MAX_ENTRIES", "256"))
+_pdf_store = create_cache_backend(
+    ttl=PDF_STORE_TTL_SECONDS,
+    prefix="studygenie:pdf:",
+    maxsize=PDF_STORE_MAX_ENTRIES
+)
+
+
 app = FastAPI(
     title="AI Tutor API",
     description="API for generating personalized tutoring content and quizzes",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+# Comma-separated browser origins allowed to call the API with credentials. Without it any
+# origin may call, but without credentials: "*" with credentials is invalid CORS, and the
+# plain wildcard lets Starlette send a constant header instead of echoing each request's origin
+FRONTEND_ORIGINS = [origin.strip() for origin in os.getenv("FRONTEND_ORIGINS", "").split(",") if origin.strip()]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # For development - restrict in production
-    allow_credentials=True,
+    allow_origins=FRONTEND_ORIGINS or ["*"],
+    allow_credentials=bool(FRONTEND_ORIGINS),
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
-class TutorRequest(BaseModel):
-    subject: str = Field(..., description="Academic subject")
-    level: str = Field(..., description="Learning level (Beginner, Intermediate, Advanced)")
-    question: str = Field(..., description="User's question")
-    learning_style: str = Field("Text-based", description="Preferred learning style")
-    background: str = Field("Unknown", description="Background knowledge level")
-    language: str = Field("English", description="Preferred language")
-
-class QuizRequest(BaseModel):
-    subject: str = Field(..., description="Academic subject")
-    level: str = Field(..., description="Learning level")
-    num_questions: int = Field(5, description="Number of quiz questions", ge=1, le=10)
-    reveal_format: Optional[bool] = Field(True, description="Whether to format with hidden answers")
-
-class QuizQuestion(BaseModel):
-    question: str
-    options: List[str]
-    correct_answer: str
-    explanation: Optional[str] = None
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(request: Request, exc: LLMOverloadedError):
+    """
+    Tell clients to back off and retry when the AI model's request queue is full.
+    """
+    return ORJSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+# Request bodies are decoded and validated by msgspec straight from the raw JSON or MessagePack
+class TutorRequest(msgspec.Struct):
+    subject: Annotated[str, Meta(description="Academic subject")]
+    level: Annotated[str, Meta(description="Learning level (Beginner, Intermediate, Advanced)")]
+    question: Annotated[str, Meta(description="User's question")]
+    learning_style: Annotated[str, Meta(description="Preferred learning style")] = "Text-based"
+    background: Annotated[str, Meta(description="Background knowledge level")] = "Unknown"
+    language: Annotated[str, Meta(description="Preferred language")] = "English"
 
+class QuizRequest(msgspec.Struct):
+    subject: Annotated[str, Meta(description="Academic subject")]
+    level: Annotated[str, Meta(description="Learning level")]
+    num_questions: Annotated[int, Meta(ge=1, le=10, description="Number of quiz questions")] = 5
+    reveal_format: Annotated[Optional[bool], Meta(description="Whether to format with hidden answers")] = True
+
+class PDFDiscussionRequest(msgspec.Struct):
+    question: Annotated[str, Meta(description="User's question about the PDF content")]
+    pdf_id: Annotated[Optional[str], Meta(description="Handle returned by /process_pdf")] = None
+    # Older clients send the content itself instead of a pdf_id
+    pdf_content: Annotated[Optional[str], Meta(description="PDF content for context")] = None
+    pdf_summary: Annotated[Optional[str], Meta(description="PDF summary for context")] = None
+
+# Response models only document the API; handlers return plain dicts that are
+# serialized directly, without a second validation pass
 class TutorResponse(BaseModel):
     response: str
 
 class QuizResponse(BaseModel):
     quiz: List[Dict[str, Any]]
     formatted_quiz: Optional[str] = None
-
-class PDFDiscussionRequest(BaseModel):
-    question: str = Field(..., description="User's question about the PDF content")
-    pdf_content: str = Field(..., description="PDF content for context")
-    pdf_summary: str = Field(..., description="PDF summary for context")
+    # True for the placeholder quiz served when generation failed; clients shouldn't cache it
+    is_fallback: bool = False
 
 class PDFDiscussionResponse(BaseModel):
     response: str
 
 
-@app.post("/tutor", response_model=TutorResponse)
-async def get_tutoring_response(data: TutorRequest):
+# Clients sending this content type, or listing it in Accept, talk MessagePack instead of JSON
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+_msgpack_encoder = msgspec.msgpack.Encoder()
+
+# Limit on a gzip-encoded request body once inflated, so a small upload can't expand without bound
+MAX_INFLATED_BODY_BYTES = 32 * 1024 * 1024
+
+
+def _inflate_gzip(body):
+    """Helper function to decompress a gzip-encoded request body"""
+    
+    inflater = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
     try:
-        explanation = generate_tutoring_response(
+        inflated = inflater.decompress(body, MAX_INFLATED_BODY_BYTES)
+    except zlib.error as e:
+        raise HTTPException(status_code=400, detail=f"Invalid gzip body: {str(e)}")
+    if inflater.unconsumed_tail:
+        raise HTTPException(status_code=413, detail="Request body is too large once decompressed")
+    return inflated
+
+
+def _request_body(struct_type):
+    """
+    Helper function to build a dependency that decodes the request body into a msgspec Struct.
+    Bodies are JSON unless sent as application/msgpack; bodies sent with
+    Content-Encoding: gzip are decompressed first.
+    """
+    
+    json_decoder = msgspec.json.Decoder(struct_type)
+    msgpack_decoder = msgspec.msgpack.Decoder(struct_type)
+    
+    async def decode(request: Request):
+        body = await request.body()
+        if request.headers.get("content-encoding", "").lower() == "gzip":
+            body = _inflate_gzip(body)
+        if request.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+            decoder = msgpack_decoder
+        else:
+            decoder = json_decoder
+        try:
+            return decoder.decode(body)
+        except msgspec.DecodeError as e:
+            # Covers both malformed bodies and msgspec.ValidationError
+            raise HTTPException(status_code=422, detail=str(e))
+    
+    return decode
+
+
+def _negotiate(request, content):
+    """Helper function to send a response body as MessagePack to clients that accept it, and as JSON otherwise"""
+    
+    if MSGPACK_MEDIA_TYPE in request.headers.get("accept", ""):
+        return Response(content=_msgpack_encoder.encode(content), media_type=MSGPACK_MEDIA_TYPE)
+    return content
+
+
+@app.post("/tutor", responses={200: {"model": TutorResponse}})
+async def get_tutoring_response(request: Request, data: TutorRequest = Depends(_request_body(TutorRequest))):
+    try:
+        explanation = await generate_tutoring_response(
             data.subject, 
             data.level, 
             data.question, 
@@ -77,18 +222,68 @@ async def get_tutoring_response(data: TutorRequest):
             data.background, 
             data.language
         )
-        return {"response": explanation}
+        return _negotiate(request, {"response": explanation})
+    except LLMOverloadedError:
+        raise
     except Exception as e:
-        return {"response": f"❌ Error generating explanation: {str(e)}"}
+        return _negotiate(request, {"response": f"❌ Error generating explanation: {str(e)}"})
+
+
+def _sse_event(text, event=None):
+    """Helper function to encode text as a server-sent event, one data line per text line"""
+    
+    lines = [f"event: {event}"] if event else []
+    lines.extend(f"data: {line}" for line in text.split("\n"))
+    return "\n".join(lines) + "\n\n"
 
 
-@app.post("/quiz", response_model=QuizResponse)
-async def generate_quiz_api(data: QuizRequest):
+@app.post("/tutor/stream")
+async def stream_tutoring_response_api(data: TutorRequest = Depends(_request_body(TutorRequest))):
+    """
+    Stream the tutoring response as server-sent events while it is generated.
+    Use /tutor for a single JSON response instead.
+    """
+    chunks = stream_tutoring_response(
+        data.subject,
+        data.level,
+        data.question,
+        data.learning_style,
+        data.background,
+        data.language
+    )
+    
+    # The first chunk is awaited before the response starts, so an overloaded
+    # model is still answered with 503 and Retry-After rather than an error event
+    first_chunk, first_error = None, None
+    try:
+        first_chunk = await anext(chunks, None)
+    except LLMOverloadedError:
+        raise
+    except Exception as e:
+        first_error = e
+    
+    async def token_generator():
+        try:
+            if first_error is not None:
+                raise first_error
+            if first_chunk is not None:
+                yield _sse_event(first_chunk)
+            async for chunk in chunks:
+                yield _sse_event(chunk)
+            yield _sse_event("", event="done")
+        except Exception as e:
+            yield _sse_event(f"❌ Error generating explanation: {str(e)}", event="error")
+    
+    return StreamingResponse(token_generator(), media_type="text/event-stream")
+
+
+@app.post("/quiz", responses={200: {"model": QuizResponse}})
+async def generate_quiz_api(request: Request, data: QuizRequest = Depends(_request_body(QuizRequest))):
     """
     Generate a quiz with multiple-choice questions based on subject and level.
     """
     try:
-        quiz_result = generate_quiz(
+        quiz_result = await generate_quiz(
             data.subject, 
             data.level, 
             data.num_questions,
@@ -96,13 +291,19 @@ async def generate_quiz_api(data: QuizRequest):
         )
         
         if data.reveal_format:
-            return {
+            return _negotiate(request, {
                 "quiz": quiz_result["quiz_data"],
-                "formatted_quiz": quiz_result["formatted_quiz"]
-            }
+                "formatted_quiz": quiz_result["formatted_quiz"],
+                "is_fallback": quiz_result["is_fallback"]
+            })
         else:
-            return {"quiz": quiz_result["quiz_data"]}
+            return _negotiate(request, {
+                "quiz": quiz_result["quiz_data"],
+                "is_fallback": quiz_result["is_fallback"]
+            })
             
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating quiz: {str(e)}")
     
@@ -110,188 +311,93 @@ async def generate_quiz_api(data: QuizRequest):
 
 
 
+def _etag_matches(if_none_match, etag):
+    """Helper function to check an If-None-Match header, which may list several ETags"""
+    
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
 @app.get("/quiz-html/{subject}/{level}/{num_questions}", response_class=HTMLResponse)
-async def get_quiz_html(subject: str, level: str, num_questions: int = 5):
+async def get_quiz_html(request: Request, subject: str, level: str, num_questions: int = 5):
     """
     Get a formatted HTML quiz page.
+    The page is cacheable by browsers and proxies for as long as the server caches the quiz.
     """
+    # The quiz depends only on the URL, so its ETag is known before anything is generated
+    etag = '"' + hashlib.blake2b(f"{subject}|{level}|{num_questions}".encode(), digest_size=16).hexdigest() + '"'
+    cache_headers = {"ETag": etag, "Cache-Control": f"public, max-age={CACHE_TTL_SECONDS}"}
+    
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    
     try:
-        quiz_result = generate_quiz(subject, level, num_questions, reveal_answer=True)
-        return quiz_result["formatted_quiz"]
+        quiz_result = await generate_quiz(subject, level, num_questions, reveal_answer=True)
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating quiz HTML: {str(e)}")
+    
+    # Never let clients hold on to the placeholder quiz
+    headers = {"Cache-Control": "no-store"} if quiz_result["is_fallback"] else cache_headers
+    return HTMLResponse(content=quiz_result["formatted_quiz"], headers=headers)
 
 
 
 @app.post("/process_pdf")
-async def process_pdf(file: UploadFile = File(...)):
+async def process_pdf(request: Request, file: UploadFile = File(...)):
     """
     Process uploaded PDF file and extract content/summary.
     """
     try:
-        # Debug info
-        # print(f"Received file: {file.filename}")
-        # print(f"Content type: {file.content_type}")
-        # print(f"File size: {file.size if hasattr(file, 'size') else 'Unknown'}")
-        
         # More flexible PDF validation
         if file.filename and not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="File must have .pdf extension")
         
-        # Read PDF content
-        pdf_content = await file.read()
-        print(f"Read {len(pdf_content)} bytes")
+        # Starlette has already spooled the upload to a temporary file (rolling over
+        # to disk for large PDFs), so parse from it directly instead of reading it into memory
+        await file.seek(0)
+        logger.debug("Received %s (%s, %s bytes)", file.filename, file.content_type, file.size)
         
-        # Extract text from PDF
-        pdf_text = ""
+        # The same file uploaded again skips both parsing and the model, as long as
+        # its text is still around for /discuss_pdf
+        pdf_id = await pdf_content_hash(file.file)
+        cache_key = make_cache_key("processed-pdf", pdf_id)
+        cached = await _processed_pdf_cache.get(cache_key)
+        if cached is not None and await _pdf_store.get(pdf_id) is not None:
+            logger.info("Serving cached PDF processing result")
+            return {"filename": file.filename, **cached}
+        
+        # Extract text from PDF off the event loop
         try:
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_content))
-            print(f"PDF has {len(pdf_reader.pages)} pages")
-            
-            for page in pdf_reader.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    pdf_text += page_text + "\n"
-                    print(f"Page {len(pdf_reader.pages)}: {len(page_text)} characters")
+            pdf_text, page_count, truncated = await extract_pdf_text(
+                file.file,
+                request.app.state.pdf_pool,
+                early_stop_chars=MAX_PDF_TEXT_CHARS
+            )
         except Exception as e:
-            print(f"PyPDF2 error: {str(e)}")
+            logger.error(f"PDF extraction error: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Error reading PDF: {str(e)}")
         
         if not pdf_text.strip():
             raise HTTPException(status_code=400, detail="Could not extract text from PDF")
         
-        # Generate AI-powered summary using the AI engine
+        # Generate the AI-powered summary and flashcards in one structured call
+        ai_succeeded = False
         try:
-            from ai_engine import get_llm
-            
-            llm = get_llm()
-            
-            # Create prompt for PDF analysis
-            analysis_prompt = f"""
-            Analyze the following PDF content and provide a comprehensive summary:
-            
-            PDF CONTENT:
-            {pdf_text[:3000]}  # Limit to first 3000 chars for analysis
-            
-            INSTRUCTIONS:
-            1. Provide a clear, structured summary of the main topics and key points
-            2. Identify the main themes, concepts, and important information
-            3. Organize the summary in a logical, easy-to-understand format
-            4. Highlight any key definitions, formulas, or important facts
-            5. Keep the summary concise but comprehensive (around 200-300 words)
-            
-            Please format your response with clear headings and bullet points for readability.
-            """
-            
-            # Generate AI summary
-            ai_response = llm([HumanMessage(content=analysis_prompt)])
-            ai_summary = ai_response.content
-            
-            # Generate comprehensive flashcards from the entire PDF content
-            flashcards_prompt = f"""
-            Based on the following PDF content, create comprehensive educational flashcards that cover the ENTIRE content thoroughly:
-            
-            PDF CONTENT:
-            {pdf_text}  # Use the FULL content for comprehensive coverage
-            
-            INSTRUCTIONS:
-            Your task is to create flashcards that comprehensively cover ALL the important topics, concepts, definitions, and key points from the PDF content.
-            
-            REQUIREMENTS:
-            1. Create 10-15 flashcards (or more if needed) to ensure complete coverage
-            2. Each flashcard should focus on a specific, distinct concept or topic
-            3. Cover all major sections, chapters, or themes mentioned in the content
-            4. Include flashcards for:
-               - Key definitions and terminology
-               - Important concepts and principles
-               - Formulas, equations, or mathematical concepts
-               - Historical facts, dates, or events
-               - Processes, procedures, or methodologies
-               - Examples, case studies, or applications
-               - Theories, laws, or fundamental principles
-            
-            FLASHCARD STRUCTURE:
-            Each flashcard must have:
-            - topic: The main subject area or category
-            - question: A specific, focused question about the concept
-            - answer: A clear, comprehensive explanation (2-3 sentences minimum)
-            
-            FORMAT:
-            Return ONLY a valid JSON array with this exact structure:
-            [
-                {{
-                    "topic": "Main topic or concept area",
-                    "question": "Specific question about the topic",
-                    "answer": "Clear, detailed answer explaining the concept thoroughly"
-                }}
-            ]
-            
-            IMPORTANT: Ensure the JSON is valid and covers the entire PDF content comprehensively.
-            """
-            
-            # Generate comprehensive flashcards
-            flashcards_response = llm([HumanMessage(content=flashcards_prompt)])
-            flashcards_text = flashcards_response.content
-            
-            # Parse flashcards JSON
-            import json
-            try:
-                # Extract JSON from the response (in case there's extra text)
-                import re
-                json_match = re.search(r'\[.*\]', flashcards_text, re.DOTALL)
-                if json_match:
-                    flashcards = json.loads(json_match.group())
-                else:
-                    flashcards = json.loads(flashcards_text)
-                
-                # Validate and enhance flashcards if needed
-                if len(flashcards) < 8:  # If too few flashcards, generate more
-                    additional_prompt = f"""
-                    The previous response only generated {len(flashcards)} flashcards. 
-                    Please generate additional flashcards to ensure comprehensive coverage of this content:
-                    
-                    {pdf_text[:2000]}
-                    
-                    Generate 5-8 more flashcards covering different aspects not yet covered.
-                    Return only valid JSON array.
-                    """
-                    
-                    additional_response = llm([HumanMessage(content=additional_prompt)])
-                    additional_text = additional_response.content
-                    
-                    try:
-                        additional_json = re.search(r'\[.*\]', additional_text, re.DOTALL)
-                        if additional_json:
-                            additional_flashcards = json.loads(additional_json.group())
-                            flashcards.extend(additional_flashcards)
-                    except:
-                        pass
-                
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse flashcards JSON: {str(e)}")
-                # Create comprehensive fallback flashcards
-                flashcards = [
-                    {
-                        "topic": "PDF Content Overview",
-                        "question": "What is the main topic of this document?",
-                        "answer": "This document covers various topics and concepts that need to be studied and understood."
-                    },
-                    {
-                        "topic": "Key Concepts",
-                        "question": "What are the main concepts discussed in this document?",
-                        "answer": "The document discusses important concepts, definitions, and principles related to the subject matter."
-                    },
-                    {
-                        "topic": "Important Information",
-                        "question": "What key information should be remembered from this document?",
-                        "answer": "Key information includes definitions, formulas, processes, and fundamental principles that are essential for understanding the topic."
-                    }
-                ]
+            analysis = await generate_pdf_analysis(pdf_text)
+            ai_summary = analysis["summary"]
+            flashcards = analysis["flashcards"]
+            ai_succeeded = True
             
+        except LLMOverloadedError:
+            raise
         except Exception as ai_error:
-            print(f"AI summary generation failed: {str(ai_error)}")
+            logger.error(f"AI summary generation failed: {str(ai_error)}")
             # Fallback to basic summary if AI fails
-            ai_summary = f"PDF processed successfully. Extracted {len(pdf_text)} characters of text from {len(pdf_reader.pages)} pages. Content includes: {pdf_text[:200]}..."
+            ai_summary = f"PDF processed successfully. Extracted {len(pdf_text)} characters of text from {page_count} pages. Content includes: {pdf_text[:200]}..."
             flashcards = [
                 {
                     "topic": "PDF Content",
@@ -300,73 +406,132 @@ async def process_pdf(file: UploadFile = File(...)):
                 }
             ]
         
-        return {
-            "filename": file.filename,
+        await _pdf_store.set(pdf_id, {"content": pdf_text, "summary": ai_summary})
+        
+        result = {
+            "pdf_id": pdf_id,
             "content": pdf_text[:1000] + "..." if len(pdf_text) > 1000 else pdf_text,
             "summary": ai_summary,
             "flashcards": flashcards,
-            "total_chars": len(pdf_text),
-            "pages": len(pdf_reader.pages)
+            # Extraction stops once MAX_PDF_TEXT_CHARS are collected, so this is the
+            # length of the text used, not of the whole document
+            "extracted_chars": len(pdf_text),
+            # Whether pages after the extracted ones were skipped
+            "truncated": truncated,
+            "pages": page_count
         }
         
-    except HTTPException:
+        # Only cache real analyses, so a transient model failure isn't replayed
+        if ai_succeeded:
+            await _processed_pdf_cache.set(cache_key, result)
+        
+        return {"filename": file.filename, **result}
+        
+    except (HTTPException, LLMOverloadedError):
         raise
     except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+        logger.error(f"Unexpected error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
 
-@app.post("/discuss_pdf", response_model=PDFDiscussionResponse)
-async def discuss_pdf_content(data: PDFDiscussionRequest):
+@app.post("/process_pdf_batch")
+async def process_pdf_batch(request: Request, files: List[UploadFile] = File(...)):
     """
-    Answer user questions based on the uploaded PDF content only.
+    Queue several PDFs for summary and flashcard generation through Gemini Batch Mode.
+    Returns a job id to poll with /batch_status/{job_id}; use /process_pdf for a single interactive upload.
     """
-    try:
-        from ai_engine import get_llm
-        
-        llm = get_llm()
-        
-        # Create a strict prompt that only allows answers based on PDF content
-        discussion_prompt = f"""
-        You are a helpful study assistant that can ONLY answer questions based on the provided PDF content.
-        
-        IMPORTANT RULES:
-        1. ONLY answer questions using information from the PDF content provided
-        2. If the question cannot be answered from the PDF content, say "I can only answer questions based on the content of your uploaded PDF. This question cannot be answered from the information available in your document."
-        3. Do NOT use any external knowledge or general information
-        4. Base your answers ONLY on the PDF content and summary provided
-        5. Be helpful and educational, but stay within the bounds of the PDF content
-        
-        PDF CONTENT:
-        {data.pdf_content}
-        
-        PDF SUMMARY:
-        {data.pdf_summary}
-        
-        USER QUESTION:
-        {data.question}
-        
-        INSTRUCTIONS:
-        - Analyze the question carefully
-        - Search through the PDF content for relevant information
-        - Provide a clear, helpful answer based ONLY on the PDF content
-        - If the PDF doesn't contain enough information to answer the question, politely explain this limitation
-        - Use the PDF content to provide specific examples, definitions, or explanations when possible
-        
-        Your response should be educational, clear, and strictly based on the PDF content provided.
-        """
+    documents = []
+    for file in files:
+        if file.filename and not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail=f"{file.filename} must have .pdf extension")
         
-        # Generate AI response
-        ai_response = llm([HumanMessage(content=discussion_prompt)])
-        ai_answer = ai_response.content
+        try:
+            await file.seek(0)
+            pdf_text, _, _ = await extract_pdf_text(
+                file.file,
+                request.app.state.pdf_pool,
+                early_stop_chars=MAX_PDF_TEXT_CHARS
+            )
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error reading {file.filename}: {str(e)}")
         
-        return {"response": ai_answer}
+        if not pdf_text.strip():
+            raise HTTPException(status_code=400, detail=f"Could not extract text from {file.filename}")
+        documents.append((file.filename, pdf_text))
+    
+    try:
+        return await submit_pdf_analysis_batch(documents)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error submitting PDF batch: {str(e)}")
+
+
+@app.get("/batch_status/{job_id}")
+async def batch_status(job_id: str):
+    """
+    Get the state of a PDF batch job, with each file's summary and flashcards once it has finished.
+    """
+    try:
+        job = await get_pdf_analysis_batch(job_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error checking PDF batch: {str(e)}")
+    
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+@app.post("/discuss_pdf", responses={200: {"model": PDFDiscussionResponse}})
+async def discuss_pdf_content(request: Request, data: PDFDiscussionRequest = Depends(_request_body(PDFDiscussionRequest))):
+    """
+    Answer user questions based on the uploaded PDF content only.
+    The PDF is identified by the pdf_id from /process_pdf, or given inline as pdf_content and pdf_summary.
+    """
+    if data.pdf_id is not None:
+        document = await _pdf_store.get(data.pdf_id)
+        if document is None:
+            raise HTTPException(status_code=404, detail="PDF not found; please upload it again")
+        pdf_content, pdf_summary = document["content"], document["summary"]
+    elif data.pdf_content is not None and data.pdf_summary is not None:
+        pdf_content, pdf_summary = data.pdf_content, data.pdf_summary
+    else:
+        raise HTTPException(status_code=422, detail="Either pdf_id or pdf_content and pdf_summary is required")
+    
+    try:
+        ai_answer = await generate_pdf_discussion_response(
+            data.question,
+            pdf_content,
+            pdf_summary
+        )
+        return _negotiate(request, {"response": ai_answer})
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
-        print(f"PDF discussion error: {str(e)}")
+        logger.error(f"PDF discussion error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error generating discussion response: {str(e)}")
 
 
+# Admin-only routes must be called with this token in the X-Admin-Token header; unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def _require_admin(x_admin_token: Optional[str] = Header(default=None)):
+    """Helper function to reject callers without the configured admin token"""
+    
+    if not ADMIN_TOKEN or x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@app.post("/cache/clear", dependencies=[Depends(_require_admin)])
+async def clear_cache():
+    """
+    Clear cached tutoring responses, quizzes and processed PDFs.
+    Requires the X-Admin-Token header to match ADMIN_TOKEN; disabled when ADMIN_TOKEN is unset.
+    """
+    cleared = await clear_response_cache() + await _processed_pdf_cache.clear()
+    return {"cleared": cleared}
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import logging
+import math
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pypdfium2 as pdfium
+
+
+logger = logging.getLogger(__name__)
+
+# PDFs with fewer pages than this are extracted in a single thread; shipping the
+# document to worker processes costs more than it saves on short files
+PARALLEL_MIN_PAGES = 5
+# Page extraction is CPU-bound, so more workers than cores would only contend
+PROCESS_POOL_WORKERS = os.cpu_count() or 1
+COPY_CHUNK_SIZE = 64 * 1024
+
+# PDFium is not thread-safe, so in-process use is serialized; worker processes each
+# have their own copy of the library
+_pdfium_lock = threading.Lock()
+
+
+def create_process_pool():
+    """
+    Create the process pool used to extract long PDFs.
+
+    The pool is meant to be created once at application startup and shared by
+    every request, so worker processes are not spawned per upload.
+
+    Returns:
+        ProcessPoolExecutor: Pool with one worker per CPU core
+    """
+    return ProcessPoolExecutor(max_workers=PROCESS_POOL_WORKERS)
+
+
+def _open_pdf(source):
+    """Helper function to open a PDF with PDFium, falling back to pypdf for files PDFium rejects"""
+
+    try:
+        return pdfium.PdfDocument(source)
+    except pdfium.PdfiumError as e:
+        logger.warning(f"PDFium could not open the PDF, falling back to pypdf: {str(e)}")
+        if hasattr(source, "seek"):
+            source.seek(0)
+        # Only needed for the rare file PDFium rejects, so it isn't loaded at startup
+        import pypdf
+
+        # strict=False tolerates minor spec violations instead of running extra validation
+        return pypdf.PdfReader(source, strict=False)
+
+
+def _page_count(document):
+    if isinstance(document, pdfium.PdfDocument):
+        return len(document)
+    return len(document.pages)
+
+
+def _page_text(document, page_number):
+    """Helper function to extract one page's text with whichever library opened the PDF"""
+
+    if not isinstance(document, pdfium.PdfDocument):
+        return document.pages[page_number].extract_text() or ""
+
+    page = document[page_number]
+    text_page = page.get_textpage()
+    try:
+        return text_page.get_text_range()
+    finally:
+        text_page.close()
+        page.close()
+
+
+def _close_pdf(document):
+    if isinstance(document, pdfium.PdfDocument):
+        document.close()
+
+
+def _extract_pages(document, start, stop, early_stop_chars=None):
+    """Helper function to extract the text of pages [start, stop), stopping once early_stop_chars are collected"""
+
+    page_texts = []
+    collected = 0
+    for page_number in range(start, stop):
+        page_text = _page_text(document, page_number)
+        # Lazy %-formatting, so nothing is formatted per page unless DEBUG is enabled
+        logger.debug("Page %d: %d characters", page_number + 1, len(page_text))
+        page_texts.append(page_text)
+        collected += len(page_text)
+        if early_stop_chars is not None and collected >= early_stop_chars:
+            break
+    return page_texts
+
+
+def _extract_short_pdf(pdf_file, early_stop_chars):
+    """
+    Helper function to count a PDF's pages and, if it is short, extract it in this thread.
+
+    Returns:
+        tuple: Page texts (None if the PDF is long enough for the process pool) and the page count
+    """
+    with _pdfium_lock:
+        document = _open_pdf(pdf_file)
+        try:
+            page_count = _page_count(document)
+            if page_count >= PARALLEL_MIN_PAGES:
+                return None, page_count
+            return _extract_pages(document, 0, page_count, early_stop_chars), page_count
+        finally:
+            _close_pdf(document)
+
+
+def _extract_page_range(pdf_path, start, stop):
+    """Helper function run in a worker process to extract a range of pages"""
+
+    document = _open_pdf(pdf_path)
+    try:
+        return _extract_pages(document, start, stop)
+    finally:
+        _close_pdf(document)
+
+
+def _hash_file(pdf_file):
+    """Helper function to hash a file's bytes in chunks, leaving it positioned at the start"""
+
+    pdf_file.seek(0)
+    digest = hashlib.blake2b(digest_size=16)
+    for chunk in iter(lambda: pdf_file.read(COPY_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    pdf_file.seek(0)
+    return digest.hexdigest()
+
+
+async def pdf_content_hash(pdf_file):
+    """
+    Compute a content hash identifying a PDF's bytes, without blocking the event loop.
+
+    Args:
+        pdf_file: Binary file object containing the PDF
+
+    Returns:
+        str: BLAKE2b hex digest of the file's contents
+    """
+    return await asyncio.to_thread(_hash_file, pdf_file)
+
+
+def _copy_to_temp_file(pdf_file):
+    """Helper function to copy the PDF, in chunks, to a named file worker processes can open"""
+
+    pdf_file.seek(0)
+    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_file:
+        shutil.copyfileobj(pdf_file, temp_file, COPY_CHUNK_SIZE)
+    return temp_file.name
+
+
+async def _extract_pages_parallel(pool, pdf_file, page_count, early_stop_chars=None):
+    """Helper function to spread page extraction over the process pool"""
+
+    # Workers get a file path rather than the PDF bytes, so memory stays bounded and
+    # only a short string is pickled per task
+    pdf_path = await asyncio.to_thread(_copy_to_temp_file, pdf_file)
+    try:
+        return await _extract_pages_in_waves(pool, pdf_path, page_count, early_stop_chars)
+    finally:
+        os.unlink(pdf_path)
+
+
+async def _extract_pages_in_waves(pool, pdf_path, page_count, early_stop_chars):
+    loop = asyncio.get_running_loop()
+
+    # Without a budget every page is needed, so hand them all out at once; with one,
+    # work in waves of one page per worker and stop as soon as enough text is in
+    wave_size = page_count if early_stop_chars is None else PROCESS_POOL_WORKERS
+
+    page_texts = []
+    collected = 0
+    for wave_start in range(0, page_count, wave_size):
+        wave_stop = min(wave_start + wave_size, page_count)
+        pages_per_worker = math.ceil((wave_stop - wave_start) / PROCESS_POOL_WORKERS)
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, _extract_page_range, pdf_path, start, min(start + pages_per_worker, wave_stop))
+            for start in range(wave_start, wave_stop, pages_per_worker)
+        ))
+
+        for wave_texts in results:
+            page_texts.extend(wave_texts)
+            collected += sum(len(page_text) for page_text in wave_texts)
+
+        if early_stop_chars is not None and collected >= early_stop_chars:
+            break
+
+    return page_texts
+
+
+async def extract_pdf_text(pdf_file, pool, early_stop_chars=None):
+    """
+    Extract the text of a PDF's pages without blocking the event loop.
+
+    Text is extracted with PDFium (pypdfium2), falling back to pypdf for files
+    PDFium can't open. Short PDFs are parsed in a worker thread; longer ones are
+    split across a process pool so extraction uses every core.
+
+    Args:
+        pdf_file: Binary file object positioned at the start of the PDF
+        pool (ProcessPoolExecutor): Shared pool from create_process_pool()
+        early_stop_chars (int, optional): Stop extracting once at least this many
+            characters have been collected; None extracts every page
+
+    Returns:
+        tuple[str, int, bool]: Extracted text, the total number of pages in the PDF,
+            and whether extraction stopped at early_stop_chars before the last page
+    """
+    page_texts, page_count = await asyncio.to_thread(_extract_short_pdf, pdf_file, early_stop_chars)
+    logger.info(f"PDF has {page_count} pages")
+
+    if page_texts is None:
+        page_texts = await _extract_pages_parallel(pool, pdf_file, page_count, early_stop_chars)
+
+    # Collect page texts and join once rather than growing a string per page
+    parts = []
+    for page_text in page_texts:
+        if page_text:
+            parts.append(page_text)
+            parts.append("\n")
+
+    return "".join(parts), page_count, len(page_texts) < page_count
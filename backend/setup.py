@@ -0,0 +1,23 @@
+# Optional: compile the backend's helper modules with Cython
+#
+#     pip install Cython
+#     python setup.py build_ext --inplace
+#
+# The compiled extension modules are written next to the sources and are imported in
+# their place; delete the .so files to go back to the interpreted modules.
+#
+# main.py and ai_engine.py stay interpreted: FastAPI decides whether to await an endpoint
+# with inspect.iscoroutinefunction, which is False for Cython coroutines, and the pydantic
+# and msgspec models are built from class annotations at import time.
+from setuptools import setup
+from Cython.Build import cythonize
+
+
+setup(
+    name="studygenie-backend-extensions",
+    ext_modules=cythonize(
+        ["batch_store.py", "llm_batch.py", "llm_cache.py", "pdf_utils.py"],
+        language_level=3,
+        compiler_directives={"boundscheck": False, "wraparound": False}
+    ),
+)
@@ -1,13 +1,19 @@
+import asyncio
+from collections import OrderedDict
+import hashlib
+import json
 import os
+import tempfile
+import diskcache
+import msgspec
 from dotenv import load_dotenv
 import streamlit as st
+import httpx
+import pandas as pd
 import requests
-import uuid
-import random
+from requests_toolbelt import MultipartEncoder
 from streamlit.components.v1 import html
 
-load_dotenv()
-
 # Page configuration
 st.set_page_config(page_title="📚 AI Tutor", layout="wide")
 
@@ -45,7 +51,228 @@ with st.sidebar:
     )
 
 
-API_ENDPOINT = os.getenv("BACKEND_URL")
+@st.cache_resource(show_spinner=False)
+def load_config():
+    """Read .env and the environment once per server process rather than on every rerun"""
+    load_dotenv()
+    return {"backend_url": os.getenv("BACKEND_URL")}
+
+
+API_ENDPOINT = load_config()["backend_url"]
+
+# Discuss answers remembered per browser session
+QA_CACHE_SIZE = 128
+# Most recent Discuss messages always shown; older ones are collapsed
+CHAT_HISTORY_WINDOW = 50
+# Backend responses are kept on disk this long, across sessions and restarts
+DISK_CACHE_TTL = 24 * 3600
+# Requests and responses are exchanged with the backend as MessagePack rather than JSON
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_HEADERS = {"Content-Type": MSGPACK_MEDIA_TYPE, "Accept": MSGPACK_MEDIA_TYPE}
+
+
+# Static help text for the empty Flashcards and Discuss tabs, built once at import
+_EXAMPLE_FLASHCARD_MD = """
+When you upload a PDF, the AI will automatically generate flashcards like this:
+
+**Topic:** Machine Learning Basics
+**Question:** What is supervised learning?
+**Answer:** Supervised learning is a type of machine learning where the algorithm learns from labeled training data to make predictions on new, unseen data.
+"""
+
+_EXAMPLE_QUESTIONS_MD = """
+Once you upload a PDF, you can ask questions like:
+
+**📚 Content Questions:**
+- "What are the main topics covered in this document?"
+- "Can you explain the key concepts mentioned?"
+- "What are the important definitions I should know?"
+
+**🔍 Specific Questions:**
+- "What does [specific term] mean?"
+- "How does [concept] work?"
+- "What are the steps in [process]?"
+
+**📖 Study Help:**
+- "Summarize the main points of [section]"
+- "What are the key takeaways from this document?"
+- "Can you give me examples of [concept]?"
+"""
+
+
+@st.cache_resource
+def get_session():
+    """Shared HTTP session, so backend calls reuse pooled keep-alive connections across reruns"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def _parse_response(response):
+    """Helper to decode a backend response, raising for failed requests"""
+    response.raise_for_status()
+    if response.headers.get("content-type", "").startswith(MSGPACK_MEDIA_TYPE):
+        data = msgspec.msgpack.decode(response.content)
+    else:
+        data = response.json()
+
+    # /tutor reports failures inside a successful response
+    if str(data.get("response", "")).startswith("❌"):
+        raise RuntimeError(data["response"].removeprefix("❌").strip())
+    return data
+
+
+@st.cache_resource
+def get_disk_cache():
+    """On-disk response cache shared by every session, so answers outlive the server process"""
+    return diskcache.Cache(
+        os.getenv("RESPONSE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "studygenie-cache"))
+    )
+
+
+def _disk_cache_key(path, payload):
+    """Helper to key a backend call on its path and canonically serialized payload"""
+    canonical = json.dumps(payload, sort_keys=True)
+    return hashlib.blake2b(f"{path}|{canonical}".encode(), digest_size=16).hexdigest()
+
+
+class _UncachedResponse(Exception):
+    """Carries a response out of a memoized call without it being cached"""
+
+    def __init__(self, data):
+        super().__init__("Response not cached")
+        self.data = data
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def _post_json_cached(path, payload):
+    key = _disk_cache_key(path, payload)
+    data = get_disk_cache().get(key)
+    if data is None:
+        data = _parse_response(get_session().post(
+            f"{API_ENDPOINT}{path}", data=msgspec.msgpack.encode(payload), headers=MSGPACK_HEADERS
+        ))
+        # The backend's placeholder quiz is never cached, so the next request can get a real one;
+        # st.cache_data doesn't cache a call that raises
+        if data.get("is_fallback"):
+            raise _UncachedResponse(data)
+        get_disk_cache().set(key, data, expire=DISK_CACHE_TTL)
+    return data
+
+
+def post_json(path, payload):
+    """
+    POST a payload to the backend, memoized on the path and payload so
+    reruns and repeated questions don't trigger another model call. Responses
+    are also kept in the disk cache, so the same question from another session,
+    or after a restart, is answered without the backend.
+    Failed requests raise and placeholder quizzes are returned as is, so neither is cached.
+    """
+    try:
+        return _post_json_cached(path, payload)
+    except _UncachedResponse as e:
+        return e.data
+
+
+def stream_events(path, payload):
+    """
+    POST a JSON payload to a server-sent events endpoint, yielding each event's
+    text as it arrives. A "done" event ends the stream; an "error" event, or the
+    connection closing before "done", raises.
+    """
+    with get_session().post(f"{API_ENDPOINT}{path}", json=payload, stream=True) as response:
+        response.raise_for_status()
+        response.encoding = "utf-8"
+
+        buffer = ""
+        event, data = None, []
+        # chunk_size=None hands over each chunk as soon as the backend flushes it
+        for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+            buffer += chunk
+            *lines, buffer = buffer.split("\n")
+            for line in lines:
+                if line:
+                    field, _, value = line.partition(":")
+                    value = value.removeprefix(" ")
+                    if field == "event":
+                        event = value
+                    elif field == "data":
+                        data.append(value)
+                    continue
+
+                # A blank line ends the event
+                text = "\n".join(data)
+                if event == "error":
+                    raise RuntimeError(text.removeprefix("❌").strip())
+                if event == "done":
+                    return
+                yield text
+                event, data = None, []
+
+    # Without "done" the response was cut short, so what was received is incomplete
+    raise RuntimeError("The explanation was interrupted before it finished. Please try again.")
+
+
+async def _post_all(calls):
+    async with httpx.AsyncClient(timeout=120) as client:
+        responses = await asyncio.gather(
+            *(
+                client.post(f"{API_ENDPOINT}{path}", content=msgspec.msgpack.encode(payload), headers=MSGPACK_HEADERS)
+                for path, payload in calls
+            )
+        )
+    return [_parse_response(response) for response in responses]
+
+
+def post_json_concurrently(calls):
+    """
+    POST several (path, payload) calls to the backend at once, so the wait is
+    that of the slowest call rather than the sum of all of them. Calls already
+    in the disk cache are answered from it and not sent.
+    """
+    disk_cache = get_disk_cache()
+    keys = [_disk_cache_key(path, payload) for path, payload in calls]
+    results = [disk_cache.get(key) for key in keys]
+
+    misses = [i for i, data in enumerate(results) if data is None]
+    if misses:
+        for i, data in zip(misses, asyncio.run(_post_all([calls[i] for i in misses]))):
+            if not data.get("is_fallback"):
+                disk_cache.set(keys[i], data, expire=DISK_CACHE_TTL)
+            results[i] = data
+    return results
+
+
+def store_quiz(quiz_response, num_questions):
+    """
+    Keep a generated quiz in session state for the Quiz tab to render. The
+    backend's ready-made HTML is kept when present, and the plain questions
+    only otherwise, so reruns don't carry both.
+    """
+    if quiz_response.get("formatted_quiz"):
+        st.session_state["quiz_html"] = quiz_response["formatted_quiz"]
+        st.session_state["quiz_height"] = num_questions * 300
+        st.session_state.pop("quiz_questions", None)
+    else:
+        st.session_state.pop("quiz_html", None)
+        st.session_state["quiz_questions"] = quiz_response["quiz"]
+
+
+@st.cache_data(show_spinner=False)
+def flashcards_dataframe(cards):
+    """Build the flashcards overview table once per set of (topic, question, answer) cards"""
+    return pd.DataFrame([
+        {
+            "Card No": i + 1,
+            "Topic": topic,
+            "Question": question,
+            "Answer": answer
+        }
+        for i, (topic, question, answer) in enumerate(cards)
+    ])
+
 
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["📝 Ask a Question", "🧠 Take a Quiz", "📄 Upload PDF", "🃏 Flashcards", "💬 Discuss"])
 
@@ -53,29 +280,65 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs(["📝 Ask a Question", "🧠 Take a Quiz
 with tab1:
     # Main content area for tutoring
     st.header("Ask Your Question")
-    question = st.text_area(
-        "❓ What would you like to learn today?",
-        "Explain Newton's Second Law of Motion.",
-    )
+    # Inputs are only sent to the app when the form is submitted
+    with st.form("tutor_form"):
+        question = st.text_area(
+            "❓ What would you like to learn today?",
+            "Explain Newton's Second Law of Motion.",
+        )
+
+        also_quiz = st.checkbox("📝 Also create a quiz on this subject")
+
+        explain_submitted = st.form_submit_button("Get Explanation 🧠")
 
     # Tutor section
-    if st.button("Get Explanation 🧠"):
+    if explain_submitted:
         with st.spinner("Generating personalized explanation..."):
             try:
-                response = requests.post(
-                    f"{API_ENDPOINT}/tutor",
-                    json={
-                        "subject": subject,
-                        "level": level,
-                        "learning_style": learning_style,
-                        "language": language,
-                        "background": background,
-                        "question": question,
-                    },
-                ).json()
-
-                st.success("Here's your personalized explanation:")
-                st.markdown(response["response"], unsafe_allow_html=True)
+                tutor_payload = {
+                    "subject": subject,
+                    "level": level,
+                    "learning_style": learning_style,
+                    "language": language,
+                    "background": background,
+                    "question": question,
+                }
+
+                if also_quiz:
+                    # Generate the explanation and the quiz side by side
+                    quiz_questions = st.session_state.get("num_questions", 5)
+                    response, quiz_response = post_json_concurrently([
+                        ("/tutor", tutor_payload),
+                        (
+                            "/quiz",
+                            {
+                                "subject": subject,
+                                "level": level,
+                                "num_questions": quiz_questions,
+                                "reveal_format": True,
+                            },
+                        ),
+                    ])
+                    store_quiz(quiz_response, quiz_questions)
+
+                    st.success("Here's your personalized explanation:")
+                    st.markdown(response["response"], unsafe_allow_html=True)
+                    st.info("🧠 Your quiz is ready in the 'Take a Quiz' tab.")
+                else:
+                    st.success("Here's your personalized explanation:")
+                    # Explanations already in the disk cache (under their /tutor entry) are shown
+                    # straight away; others are shown as they are generated, then cached there
+                    cache_key = _disk_cache_key("/tutor", tutor_payload)
+                    cached = get_disk_cache().get(cache_key)
+                    if cached is not None:
+                        st.markdown(cached["response"], unsafe_allow_html=True)
+                    else:
+                        explanation = st.empty()
+                        parts = []
+                        for text in stream_events("/tutor/stream", tutor_payload):
+                            parts.append(text)
+                            explanation.markdown("".join(parts), unsafe_allow_html=True)
+                        get_disk_cache().set(cache_key, {"response": "".join(parts)}, expire=DISK_CACHE_TTL)
             except Exception as e:
                 st.error(f"Error getting explanation: {str(e)}")
                 st.info(f"Make sure the backend server is running at {API_ENDPOINT}")
@@ -85,69 +348,75 @@ with tab2:
     # Quiz section
     st.header("Test Your Knowledge")
 
-    col1, col2 = st.columns([2, 1])
+    with st.form("quiz_form"):
+        col1, col2 = st.columns([2, 1])
 
-    with col1:
-        num_questions = st.slider(
-            "Number of Questions", min_value=1, max_value=10, value=5
-        )
+        with col1:
+            num_questions = st.slider(
+                "Number of Questions", min_value=1, max_value=10, value=5, key="num_questions"
+            )
 
-    with col2:
-        quiz_button = st.button("Generate Quiz 📝", use_container_width=True)
+        with col2:
+            quiz_button = st.form_submit_button("Generate Quiz 📝", use_container_width=True)
 
     if quiz_button:
         with st.spinner("Creating quiz questions..."):
             try:
                 # Request quiz with interactive answer reveal format
-                response = requests.post(
-                    f"{API_ENDPOINT}/quiz",
-                    json={
+                response = post_json(
+                    "/quiz",
+                    {
                         "subject": subject,
                         "level": level,
                         "num_questions": num_questions,
                         "reveal_format": True,
                     },
-                ).json()
+                )
 
                 st.success("Quiz generated! Try answering these questions:")
 
-                # Use the formatted HTML with interactive elements
-                if "formatted_quiz" in response and response["formatted_quiz"]:
-                    # Display using HTML component
-                    html(response["formatted_quiz"], height=num_questions * 300)
-                else:
-                    # Fallback to simple display if formatted quiz isn't available
-                    for i, q in enumerate(response["quiz"]):
-                        with st.expander(
-                            f"Question {i + 1}: {q['question']}", expanded=True
-                        ):
-                            # Generate a random session ID to avoid conflicts between questions
-                            session_id = str(uuid.uuid4())
-
-                            # Display options as radio buttons
-                            selected = st.radio(
-                                "Select your answer:",
-                                q["options"],
-                                key=f"q_{session_id}",
-                            )
-
-                            # Check answer button
-                            if st.button("Check Answer", key=f"check_{session_id}"):
-                                if selected == q["correct_answer"]:
-                                    st.success(
-                                        f"✅ Correct! {q.get('explanation', '')}"
-                                    )
-                                else:
-                                    st.error(
-                                        f"❌ Incorrect. The correct answer is: {q['correct_answer']}"
-                                    )
-                                    if "explanation" in q:
-                                        st.info(q["explanation"])
+                # The quiz is kept in session state and rendered below, so it
+                # survives reruns without another request
+                store_quiz(response, num_questions)
 
             except Exception as e:
                 st.error(f"Error generating quiz: {str(e)}")
                 st.info(f"Make sure the backend server is running at {API_ENDPOINT}")
 
+    # Display the latest quiz using the HTML component; the per-question widgets
+    # below are only built when the backend sent no formatted quiz
+    if "quiz_html" in st.session_state:
+        html(st.session_state["quiz_html"], height=st.session_state["quiz_height"])
+    elif "quiz_questions" in st.session_state:
+        # Fallback to simple display if formatted quiz isn't available
+        for i, q in enumerate(st.session_state["quiz_questions"]):
+            with st.expander(
+                f"Question {i + 1}: {q['question']}", expanded=True
+            ):
+                # Keys derived from the question stay the same across reruns, so the
+                # selected answer survives clicking "Check Answer"
+                key_id = f"{i}_{hashlib.md5(q['question'].encode()).hexdigest()[:8]}"
+
+                # Display options as radio buttons
+                selected = st.radio(
+                    "Select your answer:",
+                    q["options"],
+                    key=f"q_{key_id}",
+                )
+
+                # Check answer button
+                if st.button("Check Answer", key=f"check_{key_id}"):
+                    if selected == q["correct_answer"]:
+                        st.success(
+                            f"✅ Correct! {q.get('explanation', '')}"
+                        )
+                    else:
+                        st.error(
+                            f"❌ Incorrect. The correct answer is: {q['correct_answer']}"
+                        )
+                        if "explanation" in q:
+                            st.info(q["explanation"])
+
 with tab3:
     st.header("📄 Upload PDF")
     uploaded_file = st.file_uploader("Upload your study PDF", type=["pdf"])
@@ -155,14 +424,27 @@ with tab3:
     if uploaded_file is not None:
         with st.spinner("Processing your PDF..."):
             try:
-                # Send file with proper metadata
-                files = {"file": (uploaded_file.name, uploaded_file.getvalue(), "application/pdf")}
-                response = requests.post(f"{API_ENDPOINT}/process_pdf", files=files)
+                # Stream the multipart body straight from the upload's file handle instead
+                # of copying the PDF into a bytes object and again into the request body
+                uploaded_file.seek(0)
+                encoder = MultipartEncoder(
+                    fields={"file": (uploaded_file.name, uploaded_file, "application/pdf")}
+                )
+                response = get_session().post(
+                    f"{API_ENDPOINT}/process_pdf",
+                    data=encoder,
+                    headers={"Content-Type": encoder.content_type},
+                )
 
                 if response.status_code == 200:
                     pdf_data = response.json()
                     st.session_state["pdf_data"] = pdf_data
                     st.success("✅ PDF processed successfully!")
+                    if pdf_data.get("truncated"):
+                        st.info(
+                            f"📄 This PDF is long, so only its first {pdf_data['extracted_chars']:,} characters "
+                            "are used for the summary, flashcards and discussion."
+                        )
                     
                     # Display PDF summary
                     st.subheader("📋 PDF Summary")
@@ -227,108 +509,119 @@ with tab4:
             
             st.markdown("---")
         
-        # Show all flashcards in a table below
-        st.subheader("📋 All Flashcards Overview")
-        import pandas as pd
-        df = pd.DataFrame([
-            {
-                "Card No": i+1,
-                "Topic": card.get("topic", "N/A"),
-                "Question": card.get("question", "N/A"),
-                "Answer": card.get("answer", "N/A")
-            }
-            for i, card in enumerate(flashcards)
-        ])
-        
-        st.dataframe(df, use_container_width=True)
+        # Show all flashcards in a table below, collapsed so it stays out of the
+        # way while stepping through cards
+        with st.expander("📋 All Flashcards Overview", expanded=False):
+            df = flashcards_dataframe(tuple(
+                (card.get("topic", "N/A"), card.get("question", "N/A"), card.get("answer", "N/A"))
+                for card in flashcards
+            ))
+            
+            st.dataframe(df, use_container_width=True)
         
     else:
-        st.info("📄 **No flashcards available yet!**")
-        st.info("1. Go to the '📄 Upload PDF' tab")
-        st.info("2. Upload a study PDF")
-        st.info("3. Come back here to see your generated flashcards!")
+        st.info(
+            "📄 **No flashcards available yet!**\n\n"
+            "1. Go to the '📄 Upload PDF' tab\n"
+            "2. Upload a study PDF\n"
+            "3. Come back here to see your generated flashcards!"
+        )
         
         # Show example flashcard structure
         st.subheader("💡 Example Flashcard Structure")
-        st.markdown("""
-        When you upload a PDF, the AI will automatically generate flashcards like this:
-        
-        **Topic:** Machine Learning Basics
-        **Question:** What is supervised learning?
-        **Answer:** Supervised learning is a type of machine learning where the algorithm learns from labeled training data to make predictions on new, unseen data.
-        """)
+        st.markdown(_EXAMPLE_FLASHCARD_MD)
 
 
 with tab5:
     st.header("💬 Discuss with Your PDF")
     
-    if "pdf_data" in st.session_state and "content" in st.session_state["pdf_data"]:
+    if "pdf_data" in st.session_state and "pdf_id" in st.session_state["pdf_data"]:
         st.success("✅ PDF loaded! You can now ask questions about your document.")
         
         # Chat interface
         if "chat_history" not in st.session_state:
             st.session_state["chat_history"] = []
         
-        # Display chat history
+        # Display chat history as chat bubbles; roles are "user" and "assistant"
         if st.session_state["chat_history"]:
             st.subheader("💬 Chat History")
-            for i, message in enumerate(st.session_state["chat_history"]):
-                if message["role"] == "user":
-                    st.markdown(f"**👤 You:** {message['content']}")
-                else:
-                    st.markdown(f"**🤖 AI:** {message['content']}")
-                if i < len(st.session_state["chat_history"]) - 1:
-                    st.markdown("---")
+            older = st.session_state["chat_history"][:-CHAT_HISTORY_WINDOW]
+            recent = st.session_state["chat_history"][-CHAT_HISTORY_WINDOW:]
+            
+            # Earlier messages are only rendered on request, so long chats don't slow every rerun
+            if older and st.toggle(f"Show {len(older)} earlier messages", key="show_older_messages"):
+                for message in older:
+                    st.chat_message(message["role"]).markdown(message["content"])
+            for message in recent:
+                st.chat_message(message["role"]).markdown(message["content"])
         
-        # User input with unique key to prevent conflicts
-        user_question = st.text_area(
-            "❓ Ask a question about your PDF content:",
-            placeholder="e.g., What are the main concepts discussed? Can you explain the key definitions?",
-            height=100,
-            key=f"user_input_{len(st.session_state.get('chat_history', []))}"
-        )
+        # Question and button are submitted together, so editing the question doesn't rerun the app
+        with st.form("discuss_form", clear_on_submit=False):
+            # User input with unique key to prevent conflicts
+            user_question = st.text_area(
+                "❓ Ask a question about your PDF content:",
+                placeholder="e.g., What are the main concepts discussed? Can you explain the key definitions?",
+                height=100,
+                key=f"user_input_{len(st.session_state.get('chat_history', []))}"
+            )
+            ask_submitted = st.form_submit_button("💬 Ask Question", use_container_width=True)
         
         col1, col2 = st.columns([3, 1])
         with col1:
-            if st.button("💬 Ask Question", use_container_width=True, key=f"ask_btn_{len(st.session_state.get('chat_history', []))}"):
+            if ask_submitted:
                 if user_question.strip():
-                    # Check if this question was already asked to prevent duplicates
-                    if "last_question" not in st.session_state or st.session_state["last_question"] != user_question.strip():
+                    question_text = user_question.strip()
+                    pdf_id = st.session_state["pdf_data"]["pdf_id"]
+                    chat_history = st.session_state["chat_history"]
+                    last_question = next(
+                        (m["content"] for m in reversed(chat_history) if m["role"] == "user"), None
+                    )
+
+                    # Check if this question was just asked to prevent duplicate submissions
+                    if last_question != question_text:
                         # Add user question to chat history
-                        st.session_state["chat_history"].append({
+                        chat_history.append({
                             "role": "user",
-                            "content": user_question.strip()
+                            "content": question_text
                         })
-                        
-                        # Store the last question to prevent duplicates
-                        st.session_state["last_question"] = user_question.strip()
-                        
+
+                        # Answers already given for this PDF are reused without asking the backend
+                        qa_cache = st.session_state.setdefault("qa_cache", OrderedDict())
+                        qa_key = hashlib.blake2b(f"{pdf_id}|{question_text}".encode(), digest_size=16).hexdigest()
+
                         # Get AI response based on PDF content
                         with st.spinner("🤔 Thinking..."):
                             try:
-                                response = requests.post(
-                                    f"{API_ENDPOINT}/discuss_pdf",
-                                    json={
-                                        "question": user_question.strip(),
-                                        "pdf_content": st.session_state["pdf_data"]["content"],
-                                        "pdf_summary": st.session_state["pdf_data"]["summary"]
-                                    }
-                                )
-                                
-                                if response.status_code == 200:
-                                    ai_response = response.json()["response"]
-                                    
-                                    # Add AI response to chat history
-                                    st.session_state["chat_history"].append({
-                                        "role": "assistant",
-                                        "content": ai_response
-                                    })
-                                    
-                                    st.success("💬 Response generated!")
-                                    # No rerun needed - Streamlit will update automatically
+                                if qa_key in qa_cache:
+                                    qa_cache.move_to_end(qa_key)
+                                    ai_response = qa_cache[qa_key]
+                                else:
+                                    # The backend keeps the PDF's text; only its id is sent
+                                    ai_response = post_json(
+                                        "/discuss_pdf",
+                                        {
+                                            "question": question_text,
+                                            "pdf_id": pdf_id
+                                        }
+                                    )["response"]
+                                    qa_cache[qa_key] = ai_response
+                                    if len(qa_cache) > QA_CACHE_SIZE:
+                                        qa_cache.popitem(last=False)
+
+                                # Add AI response to chat history
+                                chat_history.append({
+                                    "role": "assistant",
+                                    "content": ai_response
+                                })
+
+                                st.success("💬 Response generated!")
+                                # No rerun needed - Streamlit will update automatically
+
+                            except requests.HTTPError as e:
+                                if e.response.status_code == 404:
+                                    st.error("Your PDF is no longer available. Please upload it again.")
                                 else:
                                     st.error("Failed to get response. Please try again.")
-                                    
                             except Exception as e:
                                 st.error(f"Error: {str(e)}")
                                 st.info("Make sure the backend server is running.")
@@ -336,50 +629,35 @@ with tab5:
                         st.warning("This question was already asked. Please ask a different question.")
                 else:
                     st.warning("Please enter a question.")
-        
+
         with col2:
             if st.button("🗑️ Clear Chat", use_container_width=True, key="clear_chat"):
                 st.session_state["chat_history"] = []
-                if "last_question" in st.session_state:
-                    del st.session_state["last_question"]
                 st.rerun()
         
 
         
         # Instructions
         st.markdown("---")
-        st.info("💡 **How to use:**")
-        st.info("• Ask questions about concepts, definitions, or topics from your PDF")
-        st.info("• The AI will only answer based on the content of your uploaded document")
-        st.info("• Use this to clarify concepts, get explanations, or test your understanding")
+        st.info(
+            "💡 **How to use:**\n\n"
+            "- Ask questions about concepts, definitions, or topics from your PDF\n"
+            "- The AI will only answer based on the content of your uploaded document\n"
+            "- Use this to clarify concepts, get explanations, or test your understanding"
+        )
         
     else:
         st.warning("📄 **No PDF uploaded yet!**")
-        st.info("To use the Discuss feature:")
-        st.info("1. Go to the '📄 Upload PDF' tab")
-        st.info("2. Upload your study PDF")
-        st.info("3. Come back here to start discussing the content!")
+        st.info(
+            "To use the Discuss feature:\n\n"
+            "1. Go to the '📄 Upload PDF' tab\n"
+            "2. Upload your study PDF\n"
+            "3. Come back here to start discussing the content!"
+        )
         
         # Show example questions
         st.subheader("💡 Example Questions You Can Ask:")
-        st.markdown("""
-        Once you upload a PDF, you can ask questions like:
-        
-        **📚 Content Questions:**
-        - "What are the main topics covered in this document?"
-        - "Can you explain the key concepts mentioned?"
-        - "What are the important definitions I should know?"
-        
-        **🔍 Specific Questions:**
-        - "What does [specific term] mean?"
-        - "How does [concept] work?"
-        - "What are the steps in [process]?"
-        
-        **📖 Study Help:**
-        - "Summarize the main points of [section]"
-        - "What are the key takeaways from this document?"
-        - "Can you give me examples of [concept]?"
-        """)
+        st.markdown(_EXAMPLE_QUESTIONS_MD)
 
 
 # Footer